@@ -0,0 +1,95 @@
+import argparse
+import collections
+import contextlib
+import io
+import json
+import multiprocessing
+import sys
+import time
+
+import chess
+from chess.move import Move
+from chess.epd import read_positions
+
+def analyze(task):
+	# Search one position (run by the process pool)
+	number, fen, operations, backend, depth, max_time, settings = task
+	result = {"line": number, "fen": fen}
+	if operations:
+		result["epd"] = operations
+	started = time.perf_counter()
+	try:
+		position = chess.BACKENDS[backend]()
+		position.set_fen(fen)
+		for name, value in settings.items():
+			setattr(position, name, value)
+		# The search prints its progress, keep the output for the results
+		with contextlib.redirect_stdout(io.StringIO()):
+			move = position.get_best_move_iterative(max_time, max_depth = depth)
+	except Exception as e:
+		result["error"] = "{}: {}".format(type(e).__name__, e)
+		return result
+	result["move"] = str(Move.decode(move)) if move else None
+	result["score"] = position.score
+	result["pv"] = [str(Move.decode(m)) for m in position.pv]
+	result["nodes"] = position.nodes
+	result["stats"] = position.stats.as_dict()
+	result["time"] = round(time.perf_counter() - started, 3)
+	return result
+
+def run(lines, output, backend = "mailbox", depth = 4, max_time = None, processes = 1, max_in_flight = None, settings = None):
+	"""
+	Analyze the positions of lines and write one JSON line per position to output
+	Results come in the input order, at most max_in_flight positions are
+	read ahead of the results written
+	settings are position attributes to set before searching (null_move_reduction...)
+	"""
+	settings = settings or {}
+	tasks = ((number, fen, operations, backend, depth, max_time, settings) for number, fen, operations in read_positions(lines))
+	count = 0
+	if processes > 1:
+		max_in_flight = max_in_flight or 4 * processes
+		with multiprocessing.Pool(processes) as pool:
+			pending = collections.deque()
+			for task in tasks:
+				pending.append(pool.apply_async(analyze, (task,)))
+				if len(pending) >= max_in_flight:
+					write(output, pending.popleft().get())
+					count += 1
+			while pending:
+				write(output, pending.popleft().get())
+				count += 1
+	else:
+		for task in tasks:
+			write(output, analyze(task))
+			count += 1
+	return count
+
+def write(output, result):
+	output.write(json.dumps(result) + "\n")
+	output.flush()
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Search the best move of each position of a FEN or EPD file")
+	parser.add_argument("input", nargs = "?", default = "-", help = "one position per line (default: standard input)")
+	parser.add_argument("--output", default = "-", help = "JSON lines results (default: standard output)")
+	parser.add_argument("--depth", type = int, help = "search depth (default: 4, no limit with --time)")
+	parser.add_argument("--time", type = float, help = "search time per position (seconds)")
+	parser.add_argument("--processes", type = int, default = 1, help = "search that many positions at a time")
+	parser.add_argument("--max-in-flight", type = int, help = "positions read ahead of the results (default: 4 per process)")
+	parser.add_argument("--backend", choices = sorted(chess.BACKENDS), default = "mailbox")
+	parser.add_argument("--no-null-move", action = "store_true", help = "turn null move pruning off")
+	parser.add_argument("--no-lmr", action = "store_true", help = "turn late move reductions off")
+	args = parser.parse_args()
+	depth = args.depth or (64 if args.time else 4)
+	settings = {}
+	if args.no_null_move:
+		settings["null_move_reduction"] = 0
+	if args.no_lmr:
+		settings["late_move_reduction"] = 0
+	started = time.perf_counter()
+	with contextlib.ExitStack() as stack:
+		lines = sys.stdin if args.input == "-" else stack.enter_context(open(args.input))
+		output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w"))
+		count = run(lines, output, args.backend, depth, args.time, args.processes, args.max_in_flight, settings)
+	print("{} positions in {:.2f} s".format(count, time.perf_counter() - started), file = sys.stderr)
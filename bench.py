@@ -0,0 +1,151 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+import chess
+
+# Benchmark positions by game phase
+POSITIONS = {
+	"opening": (
+		"rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+		"r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+		"rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+		"rnbqkb1r/ppp1pppp/5n2/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 1 3",
+	),
+	"middlegame": (
+		"r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+		"r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+		"r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+		"2rq1rk1/pb2bppp/1pn1pn2/2pp4/2PP4/1PN1PN2/PB2BPPP/2RQ1RK1 w - - 0 11",
+	),
+	"endgame": (
+		"8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+		"8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 1",
+		"6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+		"8/5pk1/6p1/8/2B5/6P1/5PK1/8 w - - 0 1",
+	),
+}
+
+# Repetitions of each measure within a run (the search runs once)
+ITERATIONS = {"movegen": 1000, "is_check": 10000, "eval": 1000, "eval_static": 1000}
+
+def bench_movegen(positions):
+	for position in positions:
+		color = position.color_to_play
+		for i in range(ITERATIONS["movegen"]):
+			position.get_legal_moves(color)
+
+def bench_is_check(positions):
+	for position in positions:
+		color = position.color_to_play
+		for i in range(ITERATIONS["is_check"]):
+			position.is_check(color)
+
+def bench_eval(positions):
+	for position in positions:
+		for i in range(ITERATIONS["eval"]):
+			position.eval()
+
+def bench_eval_static(positions):
+	# The quiescence stand pat, evaluation of most search leaves
+	for position in positions:
+		for i in range(ITERATIONS["eval_static"]):
+			position.eval_static()
+
+BENCHMARKS = {
+	"movegen": bench_movegen,
+	"is_check": bench_is_check,
+	"eval": bench_eval,
+	"eval_static": bench_eval_static,
+}
+
+def run(backend = "mailbox", repeat = 5, depth = 3):
+	"""
+	Time each benchmark on each phase positions repeat times
+	Return {"benchmark/phase": {"median", "variance", "runs"}} (seconds)
+	and the nodes count of the searches (to tell a speed change from a
+	search change)
+	"""
+	results = {}
+	nodes = {}
+	for phase, fens in POSITIONS.items():
+		positions = []
+		for fen in fens:
+			position = chess.BACKENDS[backend]()
+			position.set_fen(fen)
+			positions.append(position)
+		for name, benchmark in BENCHMARKS.items():
+			runs = []
+			for i in range(repeat):
+				started = time.perf_counter()
+				benchmark(positions)
+				runs.append(time.perf_counter() - started)
+			results[name + "/" + phase] = runs
+		# Search from scratch (new transposition table) each run
+		runs = []
+		for i in range(repeat):
+			count = 0
+			started = time.perf_counter()
+			for fen in fens:
+				position = chess.BACKENDS[backend]()
+				position.set_fen(fen)
+				with contextlib.redirect_stdout(io.StringIO()):
+					position.get_best_move_iterative(max_depth = depth)
+				count += position.nodes
+			runs.append(time.perf_counter() - started)
+		results["search/" + phase] = runs
+		nodes[phase] = count
+	return {name: {"median": statistics.median(runs), "variance": statistics.pvariance(runs), "runs": runs}
+		for name, runs in results.items()}, nodes
+
+def compare(results, baseline, threshold):
+	"""
+	Return the regressions: (name, baseline median, median) of the
+	benchmarks slower than the baseline by more than threshold (0.1 = 10%)
+	"""
+	regressions = []
+	for name, result in results.items():
+		if name in baseline and result["median"] > baseline[name]["median"] * (1 + threshold):
+			regressions.append((name, baseline[name]["median"], result["median"]))
+	return regressions
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Time move generation, is_check, eval, the quiescence stand pat eval and search on opening, middlegame and endgame positions")
+	parser.add_argument("--repeat", type = int, default = 5, help = "runs of each benchmark (default: 5)")
+	parser.add_argument("--depth", type = int, default = 3, help = "search depth (default: 3)")
+	parser.add_argument("--backend", choices = sorted(chess.BACKENDS), default = "mailbox")
+	parser.add_argument("--output", help = "write the results to this JSON file")
+	parser.add_argument("--baseline", help = "JSON results file to compare with")
+	parser.add_argument("--threshold", type = float, default = 0.1, help = "slowdown of the median reported as a regression (default: 0.1 for 10%%)")
+	args = parser.parse_args()
+	results, nodes = run(args.backend, args.repeat, args.depth)
+	baseline = None
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+	for name, result in results.items():
+		line = "{:<24}{:>10.4f} s  (stdev {:.4f} s)".format(name, result["median"], result["variance"] ** 0.5)
+		if baseline is not None and name in baseline["results"]:
+			line += "  {:+.1%}".format(result["median"] / baseline["results"][name]["median"] - 1)
+		print(line)
+	for phase, count in nodes.items():
+		line = "search/{} nodes: {}".format(phase, count)
+		before = baseline.get("nodes", {}).get(phase, count) if baseline is not None else count
+		if before != count:
+			line += " (baseline: {}, the search changed)".format(before)
+		print(line)
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump({"python": platform.python_version(), "backend": args.backend, "depth": args.depth,
+				"results": results, "nodes": nodes}, f, indent = 1)
+	if baseline is not None:
+		regressions = compare(results, baseline["results"], args.threshold)
+		for name, before, after in regressions:
+			print("Regression: {} {:.4f} s -> {:.4f} s".format(name, before, after))
+		if regressions:
+			sys.exit(1)
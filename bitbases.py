@@ -0,0 +1,38 @@
+import argparse
+import os
+import time
+
+import chess
+from chess.bitbase import TABLES, generate, pack
+
+# Tables a pawn promotes into must be built first
+ORDER = ("kqk", "krk", "kpk")
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Generate endgame bitbases by retrograde analysis")
+	parser.add_argument("tables", nargs = "*", help = "tables to generate among {} (default: all)".format(", ".join(ORDER)))
+	parser.add_argument("--dir", default = "bitbases", help = "directory of the bitbases files (default: bitbases)")
+	args = parser.parse_args()
+	tables = args.tables or ORDER
+	for name in tables:
+		if name not in ORDER:
+			parser.error("unknown table: {}".format(name))
+	os.makedirs(args.dir, exist_ok = True)
+	position = chess.Position()
+	promotions = {}
+	for name in ORDER:
+		path = os.path.join(args.dir, name + ".bin")
+		if name not in tables and os.path.exists(path):
+			# Promotions of a pawn use an already generated table
+			with open(path, "rb") as f:
+				bits = f.read()
+			wins = bytearray((bits[i >> 3] >> (i & 7)) & 1 for i in range(len(bits) * 8))
+		elif name in tables or "kpk" in tables:
+			started = time.perf_counter()
+			wins = generate(position, TABLES[name], promotions)
+			with open(path, "wb") as f:
+				f.write(pack(wins))
+			print("{}: {} wins in {:.1f} s".format(path, sum(wins), time.perf_counter() - started))
+		else:
+			continue
+		promotions[TABLES[name]] = wins
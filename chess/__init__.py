@@ -1,2 +1,10 @@
 from .const import HUMAN, COMPUTER
 from .game import Game
+from .position import Position
+from .bitboard import BitboardPosition
+
+# Position classes by name (see the --backend option of the scripts)
+BACKENDS = {
+    "mailbox": Position,
+    "bitboard": BitboardPosition,
+}
@@ -0,0 +1,193 @@
+from .const import *
+from .piece import Piece
+
+from array import array
+import mmap
+import os
+
+# Endgame bitbases: king and one piece against a lone king
+#
+# One bit per position tells if the side with the piece (the strong side)
+# wins, otherwise it is a draw. Positions are indexed with the strong side
+# as White (Black positions are mirrored):
+#     ((strong king * 64 + weak king) * 64 + piece) * 2 + strong side to play
+# Squares are bit indexes (row * 8 + col). Illegal positions are draws.
+
+TABLES = {"kqk": QUEEN, "krk": ROOK, "kpk": PAWN}
+
+# Table name of each piece
+TABLE_NAMES = {piece: name for name, piece in TABLES.items()}
+
+SIZE = 64 * 64 * 64 * 2
+
+def get_index(strong_king, weak_king, piece, strong_to_play):
+    return ((strong_king * 64 + weak_king) * 64 + piece) * 2 + strong_to_play
+
+def _s64(sq):
+    # Bit index of a board index
+    return ROWS[sq] * 8 + COLS[sq]
+
+def generate(position, piece, promotions = None):
+    """
+    Build the bitbase of king and piece against king by retrograde analysis
+    position is a Position used for its legal moves generator
+    promotions is the bitbase (bytearray) of each piece a pawn promotes to
+    Return one byte per position (1: the strong side wins)
+    """
+    wins = bytearray(SIZE)
+    # Number of moves of the weak side positions still to be proved lost
+    pending = array("B", bytes(SIZE))
+    # Moves graph: position index, and index it goes to
+    sources, targets = array("I"), array("I")
+    queue = []
+    position.can_castle_kingside = [False, False]
+    position.can_castle_queenside = [False, False]
+    position.two_push_col = [-1, -1]
+    strong_king, weak_king = Piece.get_instance(WHITE, KING), Piece.get_instance(BLACK, KING)
+    strong_piece = Piece.get_instance(WHITE, piece)
+    for sk in range(64):
+        for wk in range(64):
+            # Kings can not be side by side
+            if wk == sk or abs((wk >> 3) - (sk >> 3)) <= 1 and abs((wk & 7) - (sk & 7)) <= 1:
+                continue
+            for p in range(64):
+                if p == sk or p == wk:
+                    continue
+                if piece == PAWN and (p < 8 or p >= 56):
+                    continue
+                pieces = [None] * 64
+                pieces[sk], pieces[wk], pieces[p] = strong_king, weak_king, strong_piece
+                for strong_to_play in (0, 1):
+                    color = WHITE if strong_to_play else BLACK
+                    position.color_to_play = color
+                    position.set_pieces(pieces)
+                    # The side that just played can not be in check
+                    if position.is_check(1 - color):
+                        continue
+                    index = get_index(sk, wk, p, strong_to_play)
+                    moves = position.get_legal_moves(color)
+                    if not strong_to_play:
+                        if not moves:
+                            # Mate wins, stalemate is a draw
+                            if position.is_check(color):
+                                wins[index] = 1
+                                queue.append(index)
+                            continue
+                        # Capturing the piece is a draw
+                        if any(m >> MOVE_CAPTURE_SHIFT & 7 for m in moves):
+                            continue
+                        pending[index] = len(moves)
+                    for m in moves:
+                        s1, s2 = _s64(m & 127), _s64(m >> MOVE_SQ2_SHIFT & 127)
+                        promote = m >> MOVE_PROMOTE_SHIFT & 7
+                        if promote:
+                            # The pawn promotes: look the other bitbase up
+                            table = promotions.get(promote) if promotions else None
+                            if table is not None and table[get_index(sk, wk, s2, 0)] and not wins[index]:
+                                wins[index] = 1
+                                queue.append(index)
+                            continue
+                        if s1 == sk:
+                            target = get_index(s2, wk, p, 1 - strong_to_play)
+                        elif s1 == wk:
+                            target = get_index(sk, s2, p, 1 - strong_to_play)
+                        else:
+                            target = get_index(sk, wk, s2, 1 - strong_to_play)
+                        sources.append(index)
+                        targets.append(target)
+    # Moves leading to each position (compressed by target index)
+    starts = array("I", bytes(4 * (SIZE + 1)))
+    for target in targets:
+        starts[target + 1] += 1
+    for i in range(SIZE):
+        starts[i + 1] += starts[i]
+    fill = array("I", starts)
+    predecessors = array("I", bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        predecessors[fill[target]] = source
+        fill[target] += 1
+    del sources, targets, fill
+    # Propagate wins backwards: the strong side wins if one move wins,
+    # the weak side loses if all its moves lose
+    while queue:
+        index = queue.pop()
+        for i in range(starts[index], starts[index + 1]):
+            source = predecessors[i]
+            if wins[source]:
+                continue
+            if source & 1:
+                wins[source] = 1
+                queue.append(source)
+            else:
+                pending[source] -= 1
+                if pending[source] == 0:
+                    wins[source] = 1
+                    queue.append(source)
+    return wins
+
+def pack(wins):
+    """Pack one byte per position into bits"""
+    bits = bytearray(len(wins) // 8)
+    for index, win in enumerate(wins):
+        if win:
+            bits[index >> 3] |= 1 << (index & 7)
+    return bits
+
+# Bitbases class
+class Bitbases:
+    """
+    Endgame bitbases files (kqk.bin, krk.bin, kpk.bin) of a directory
+    A file is memory-mapped on the first probe of its endgame, missing
+    files are just not probed
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.maps = {}
+
+    def get_map(self, name):
+        if name not in self.maps:
+            path = os.path.join(self.directory, name + ".bin")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.maps[name] = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            else:
+                self.maps[name] = None
+        return self.maps[name]
+
+    def close(self):
+        for m in self.maps.values():
+            if m is not None:
+                m.close()
+        self.maps = {}
+
+    def probe(self, position):
+        """
+        Return 1 if the color to play wins, -1 if it loses, 0 for a draw
+        and None if the position is not in the bitbases
+        """
+        strong_piece = None
+        kings = [None, None]
+        for s, piece in enumerate(position.get_pieces()):
+            if piece is None:
+                continue
+            if piece.piece == KING:
+                kings[piece.color] = s
+            elif strong_piece is None:
+                strong_piece, strong, p = piece.piece, piece.color, s
+            else:
+                return None
+        if strong_piece not in TABLE_NAMES:
+            return None
+        table = self.get_map(TABLE_NAMES[strong_piece])
+        if table is None:
+            return None
+        strong_king, weak_king = kings[strong], kings[1 - strong]
+        # Mirror the board so the strong side is White
+        if strong == BLACK:
+            strong_king, weak_king, p = strong_king ^ 56, weak_king ^ 56, p ^ 56
+        strong_to_play = 1 if position.color_to_play == strong else 0
+        index = get_index(strong_king, weak_king, p, strong_to_play)
+        if not table[index >> 3] & (1 << (index & 7)):
+            return 0
+        return 1 if strong_to_play else -1
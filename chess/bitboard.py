@@ -0,0 +1,650 @@
+from .const import *
+from .piece import *
+from .move import *
+from .zobrist import *
+from .pst import PST
+from .position import Position
+
+# Bitboards use 64 bits indexes: bit (row * 8 + col) stands for that tile
+# Board index (see const.SQUARES) of each bit index
+SQ120 = TILES
+
+# Bit index of each board index, -1 for off-board indexes
+SQ64 = tuple(TILES.index(sq) if sq in TILES else -1 for sq in range(BOARD_SIZE))
+
+def _targets(s, steps):
+    # Bitboard of the tiles reached from bit index s by one of the steps
+    bb = 0
+    for dr, dc in steps:
+        r, c = (s >> 3) + dr, (s & 7) + dc
+        if 0 <= r < 8 and 0 <= c < 8:
+            bb |= 1 << (r * 8 + c)
+    return bb
+
+def _ray(s, dr, dc):
+    # Bitboard of the tiles from bit index s (excluded) to the board edge
+    bb = 0
+    r, c = (s >> 3) + dr, (s & 7) + dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        bb |= 1 << (r * 8 + c)
+        r, c = r + dr, c + dc
+    return bb
+
+# Precomputed attacks tables
+KNIGHT_ATTACKS = tuple(_targets(s, ((-2, -1), (-2, +1), (-1, -2), (-1, +2), (+1, -2), (+1, +2), (+2, -1), (+2, +1))) for s in range(64))
+KING_ATTACKS = tuple(_targets(s, ((-1, -1), (-1, 0), (-1, +1), (0, -1), (0, +1), (+1, -1), (+1, 0), (+1, +1))) for s in range(64))
+
+# Tiles attacked by a pawn of the given color: PAWN_ATTACKS[color][s]
+PAWN_ATTACKS = (
+    tuple(_targets(s, ((-1, -1), (-1, +1))) for s in range(64)),
+    tuple(_targets(s, ((+1, -1), (+1, +1))) for s in range(64)),
+)
+
+# Rays going to higher bit indexes (the first blocker is the lowest bit)
+# and to lower bit indexes (the first blocker is the highest bit)
+ROOK_RAYS_UP = tuple(tuple(_ray(s, dr, dc) for s in range(64)) for dr, dc in ((+1, 0), (0, +1)))
+ROOK_RAYS_DOWN = tuple(tuple(_ray(s, dr, dc) for s in range(64)) for dr, dc in ((-1, 0), (0, -1)))
+BISHOP_RAYS_UP = tuple(tuple(_ray(s, dr, dc) for s in range(64)) for dr, dc in ((+1, -1), (+1, +1)))
+BISHOP_RAYS_DOWN = tuple(tuple(_ray(s, dr, dc) for s in range(64)) for dr, dc in ((-1, -1), (-1, +1)))
+
+def _slider_attacks(s, occupied, rays_up, rays_down):
+    attacks = 0
+    for rays in rays_up:
+        ray = rays[s]
+        blockers = ray & occupied
+        if blockers:
+            # Cut the ray behind the first blocker
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in rays_down:
+        ray = rays[s]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+def rook_attacks(s, occupied):
+    return _slider_attacks(s, occupied, ROOK_RAYS_UP, ROOK_RAYS_DOWN)
+
+def bishop_attacks(s, occupied):
+    return _slider_attacks(s, occupied, BISHOP_RAYS_UP, BISHOP_RAYS_DOWN)
+
+# Attacks on an empty board, to skip the sliders that are not on a line of the tile
+ROOK_LINES = tuple(rook_attacks(s, 0) for s in range(64))
+BISHOP_LINES = tuple(bishop_attacks(s, 0) for s in range(64))
+
+def _between(s1, s2):
+    # Bitboard of the tiles strictly between two bit indexes on a line, 0 if not aligned
+    for dr in (-1, 0, +1):
+        for dc in (-1, 0, +1):
+            bb = 0
+            r, c = (s1 >> 3) + dr, (s1 & 7) + dc
+            while (dr or dc) and 0 <= r < 8 and 0 <= c < 8:
+                if r * 8 + c == s2:
+                    return bb
+                bb |= 1 << (r * 8 + c)
+                r, c = r + dr, c + dc
+    return 0
+
+# Tiles between two bit indexes: BETWEEN[s1][s2] (check and pin rays)
+BETWEEN = tuple(tuple(_between(s1, s2) for s2 in range(64)) for s1 in range(64))
+
+# All the tiles, rows and columns
+ALL = (1 << 64) - 1
+RANK_3 = 0xff << 16
+RANK_6 = 0xff << 40
+PROMOTION_ROWS = 0xff | 0xff << 56
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+
+# Bitboard position class
+class BitboardPosition(Position):
+    """
+    Position backend storing pieces as one 64 bits integer per color and piece
+    Moves use the same board indexes as the 10x12 Position so both backends
+    can be used by Game and negamax
+    Legality comes from the checks and pins of the king (see
+    get_checkers_and_pins) and bitboards are walked with inline
+    "b = bb & -bb" loops, both on the hot path of the search
+    """
+
+    __slots__ = ("board", "pieces", "occupied")
+
+    def set_pieces(self, pieces):
+        # Piece on each bit index, None for an empty tile
+        self.board = list(pieces)
+        # Bitboards per color and piece: pieces[color][piece]
+        self.pieces = [[0] * 6, [0] * 6]
+        # Bitboards of all pieces per color
+        self.occupied = [0, 0]
+        # King position (board index)
+        self.king_square = [None, None]
+        for s, piece in enumerate(self.board):
+            if piece is not None:
+                self.pieces[piece.color][piece.piece] |= 1 << s
+                self.occupied[piece.color] |= 1 << s
+                if piece.piece == KING:
+                    self.king_square[piece.color] = SQ120[s]
+        # What play stores for unplay
+        self.history = []
+        # Zobrist hash
+        self.hash = self.compute_hash()
+        # Material and positional scores (White - Black)
+        self.material, self.positional = self.compute_scores()
+
+    def get_pieces(self):
+        return list(self.board)
+
+    def get_piece_count(self):
+        return bin(self.occupied[WHITE] | self.occupied[BLACK]).count("1")
+
+    def has_piece(self, color):
+        pieces = self.pieces[color]
+        return (pieces[QUEEN] | pieces[ROOK] | pieces[BISHOP] | pieces[KNIGHT]) != 0
+
+    def __str__(self):
+        s = "\n"
+        for row in range(7, -1, -1):
+            for col in range(8):
+                piece = self.board[row * 8 + col]
+                if piece is None:
+                    s += "-"
+                else:
+                    s += piece.short_str()
+            s += "\n"
+        s += "\n" + COLOR_NAMES[self.color_to_play] + " to play"
+        if self.is_check(self.color_to_play):
+            s += " (Check!)"
+        s += "\n"
+        return s
+
+    def __eq__(self, other):
+        if self.pieces != other.pieces: return False
+        if self.color_to_play != other.color_to_play: return False
+        if self.can_castle_queenside != other.can_castle_queenside: return False
+        if self.can_castle_kingside != other.can_castle_kingside: return False
+        if self.two_push_col != other.two_push_col: return False
+        return True
+
+    def compute_hash(self):
+        h = 0
+        for s, piece in enumerate(self.board):
+            if piece is not None:
+                h ^= ZOBRIST_PIECE[piece.color][piece.piece][SQ120[s]]
+        for color in (BLACK, WHITE):
+            if self.can_castle_kingside[color]:
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+            if self.can_castle_queenside[color]:
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+            if self.two_push_col[color] >= 0:
+                h ^= ZOBRIST_EN_PASSANT[self.two_push_col[color]]
+        if self.color_to_play == WHITE:
+            h ^= ZOBRIST_WHITE_TO_PLAY
+        return h
+
+    def compute_scores(self):
+        material, positional = 0, 0
+        for s, piece in enumerate(self.board):
+            if piece is not None:
+                sign = 1 if piece.color == WHITE else -1
+                material += sign * PIECE_VALUES[piece.piece]
+                positional += sign * PST[piece.color][piece.piece][SQ120[s]]
+        return material, positional
+
+    def play(self, move):
+        """
+        Play a move (encoded as an int, see const.MOVE_*)
+        """
+        board = self.board
+        sq1 = move & 127
+        sq2 = move >> MOVE_SQ2_SHIFT & 127
+        piece = move >> MOVE_PIECE_SHIFT & 7
+        capture = move >> MOVE_CAPTURE_SHIFT & 7
+        promote = move >> MOVE_PROMOTE_SHIFT & 7
+        s1, s2 = SQ64[sq1], SQ64[sq2]
+        moved = board[s1]
+        color = moved.color
+        mine, theirs = self.pieces[color], self.pieces[1 - color]
+        # Store what the move can not tell so this can be restored on unplay
+        self.history.append((self.hash, self.two_push_col[1 - color],
+            self.can_castle_kingside[color], self.can_castle_queenside[color],
+            self.can_castle_kingside[1 - color], self.can_castle_queenside[1 - color],
+            self.material, self.positional))
+        h = self.hash ^ ZOBRIST_WHITE_TO_PLAY
+        keys = ZOBRIST_PIECE[color]
+        h ^= keys[piece][sq1]
+        # Material and positional deltas from the color point of view
+        pst, their_pst = PST[color], PST[1 - color]
+        material = 0
+        positional = pst[promote or piece][sq2] - pst[piece][sq1]
+        # Captured piece
+        if capture and not move & MOVE_EN_PASSANT:
+            theirs[capture] ^= 1 << s2
+            self.occupied[1 - color] ^= 1 << s2
+            h ^= ZOBRIST_PIECE[1 - color][capture][sq2]
+            material += PIECE_VALUES[capture]
+            positional += their_pst[capture][sq2]
+        # Move the piece
+        mine[piece] ^= 1 << s1
+        self.occupied[color] ^= (1 << s1) | (1 << s2)
+        board[s2] = moved
+        board[s1] = None
+        # En Passant
+        if move & MOVE_EN_PASSANT:
+            # The captured pawn is behind the end tile
+            s = s2 - 8 if color == WHITE else s2 + 8
+            theirs[PAWN] ^= 1 << s
+            self.occupied[1 - color] ^= 1 << s
+            board[s] = None
+            h ^= ZOBRIST_PIECE[1 - color][PAWN][SQ120[s]]
+            material += PIECE_VALUES[PAWN]
+            positional += their_pst[PAWN][SQ120[s]]
+        # Promotion
+        elif promote:
+            board[s2] = moved.promote(promote)
+            material += PIECE_VALUES[promote] - PIECE_VALUES[PAWN]
+        # Castling
+        elif move & (MOVE_CASTLE_KINGSIDE | MOVE_CASTLE_QUEENSIDE):
+            if move & MOVE_CASTLE_KINGSIDE:
+                r1, r2 = s1 + 3, s1 + 1
+            else:
+                r1, r2 = s1 - 4, s1 - 1
+            # Move the rook
+            mine[ROOK] ^= (1 << r1) | (1 << r2)
+            self.occupied[color] ^= (1 << r1) | (1 << r2)
+            board[r2], board[r1] = board[r1], None
+            h ^= keys[ROOK][SQ120[r1]] ^ keys[ROOK][SQ120[r2]]
+            positional += pst[ROOK][SQ120[r2]] - pst[ROOK][SQ120[r1]]
+        mine[promote or piece] |= 1 << s2
+        h ^= keys[promote or piece][sq2]
+        if color == WHITE:
+            self.material += material
+            self.positional += positional
+        else:
+            self.material -= material
+            self.positional -= positional
+        # Special moves stuff
+        # Always reset bad side two-push
+        if self.two_push_col[1 - color] >= 0:
+            h ^= ZOBRIST_EN_PASSANT[self.two_push_col[1 - color]]
+            self.two_push_col[1 - color] = -1
+        if piece == PAWN:
+            if s2 - s1 in (16, -16):
+                # Means that next move may be "en passant"
+                self.two_push_col[color] = s1 & 7
+                h ^= ZOBRIST_EN_PASSANT[s1 & 7]
+        elif piece == ROOK:
+            if sq1 == (A1 if color == WHITE else A8) and self.can_castle_queenside[color]:
+                # Moving this rook makes queen-side castling impossible
+                self.can_castle_queenside[color] = False
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+            elif sq1 == (H1 if color == WHITE else H8) and self.can_castle_kingside[color]:
+                # Moving this rook makes king-side castling impossible
+                self.can_castle_kingside[color] = False
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+        elif piece == KING:
+            self.king_square[color] = sq2
+            # Moving the king makes castling impossible both sides
+            if self.can_castle_kingside[color]:
+                self.can_castle_kingside[color] = False
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+            if self.can_castle_queenside[color]:
+                self.can_castle_queenside[color] = False
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+        # Capturing a rook on its start tile makes castling impossible on that side
+        if capture == ROOK:
+            if sq2 == (A8 if color == WHITE else A1) and self.can_castle_queenside[1 - color]:
+                self.can_castle_queenside[1 - color] = False
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[1 - color]
+            elif sq2 == (H8 if color == WHITE else H1) and self.can_castle_kingside[1 - color]:
+                self.can_castle_kingside[1 - color] = False
+                h ^= ZOBRIST_CASTLE_KINGSIDE[1 - color]
+        # Swap color to play
+        self.color_to_play = (1 - self.color_to_play)
+        self.hash = h
+
+    def unplay(self, move):
+        """
+        Unplay a move (the last one played)
+        """
+        board = self.board
+        sq1 = move & 127
+        sq2 = move >> MOVE_SQ2_SHIFT & 127
+        piece = move >> MOVE_PIECE_SHIFT & 7
+        capture = move >> MOVE_CAPTURE_SHIFT & 7
+        promote = move >> MOVE_PROMOTE_SHIFT & 7
+        s1, s2 = SQ64[sq1], SQ64[sq2]
+        color = board[s2].color
+        mine, theirs = self.pieces[color], self.pieces[1 - color]
+        # Move the piece back
+        mine[promote or piece] ^= 1 << s2
+        mine[piece] |= 1 << s1
+        self.occupied[color] ^= (1 << s1) | (1 << s2)
+        board[s1] = INSTANCES[color][PAWN] if promote else board[s2]
+        board[s2] = None
+        # En Passant
+        if move & MOVE_EN_PASSANT:
+            s = s2 - 8 if color == WHITE else s2 + 8
+            theirs[PAWN] |= 1 << s
+            self.occupied[1 - color] |= 1 << s
+            board[s] = INSTANCES[1 - color][PAWN]
+        # Captured piece
+        elif capture:
+            theirs[capture] |= 1 << s2
+            self.occupied[1 - color] |= 1 << s2
+            board[s2] = INSTANCES[1 - color][capture]
+        # Castling
+        elif move & (MOVE_CASTLE_KINGSIDE | MOVE_CASTLE_QUEENSIDE):
+            if move & MOVE_CASTLE_KINGSIDE:
+                r1, r2 = s1 + 3, s1 + 1
+            else:
+                r1, r2 = s1 - 4, s1 - 1
+            mine[ROOK] ^= (1 << r1) | (1 << r2)
+            self.occupied[color] ^= (1 << r1) | (1 << r2)
+            board[r1], board[r2] = board[r2], None
+        # Swap color to play
+        self.color_to_play = (1 - self.color_to_play)
+        # Special moves stuff
+        (self.hash, self.two_push_col[1 - color],
+            self.can_castle_kingside[color], self.can_castle_queenside[color],
+            self.can_castle_kingside[1 - color], self.can_castle_queenside[1 - color],
+            self.material, self.positional) = self.history.pop()
+        self.two_push_col[color] = -1
+        if piece == KING:
+            self.king_square[color] = sq1
+
+    def get_legal_moves(self, color):
+        """
+        Get the legal moves from the checks and pins of the king computed on
+        the bitboards (as Position.get_legal_moves does on the board):
+        pinned pieces stay on their pin ray, in check moves must capture the
+        checker or block its ray (only king moves in double check) and the
+        king does not go to an attacked tile
+        Only en passant captures are played to be checked
+        """
+        mine, theirs = self.pieces[color], self.pieces[1 - color]
+        own = self.occupied[color]
+        occupied = own | self.occupied[1 - color]
+        k = mine[KING].bit_length() - 1
+        checkers, pins = self.get_checkers_and_pins(color, occupied)
+        # The king goes to the tiles the enemy does not attack once it left its tile
+        moves = []
+        targets = KING_ATTACKS[k] & ~(own | theirs[KING])
+        without_king = occupied ^ (1 << k)
+        move = SQ120[k] | KING << MOVE_PIECE_SHIFT
+        board = self.board
+        while targets:
+            b = targets & -targets
+            targets ^= b
+            t = b.bit_length() - 1
+            if self.is_attacked(t, color, without_king):
+                continue
+            target = board[t]
+            if target is None:
+                moves.append(move | SQ120[t] << MOVE_SQ2_SHIFT)
+            else:
+                moves.append(move | SQ120[t] << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+        if checkers:
+            # Only the king can escape a double check
+            if checkers & (checkers - 1):
+                return moves
+            evasions = BETWEEN[k][checkers.bit_length() - 1] | checkers
+        else:
+            evasions = ALL
+            moves += self.get_castling_moves(k, color, occupied)
+        n = len(moves)
+        self.add_piece_moves(moves, color, occupied, ~(own | theirs[KING]) & evasions, ~occupied & evasions, pins)
+        # En passant removes two pieces from the capture row
+        for i in range(len(moves) - 1, n - 1, -1):
+            m = moves[i]
+            if m & MOVE_EN_PASSANT:
+                self.play(m)
+                if self.is_check(color):
+                    del moves[i]
+                self.unplay(m)
+        return moves
+
+    def get_checkers_and_pins(self, color, occupied):
+        """
+        Return the bitboard of the pieces giving check to the king of color
+        and the tiles each pinned piece can go to (by bit index)
+        """
+        mine, theirs = self.pieces[color], self.pieces[1 - color]
+        k = mine[KING].bit_length() - 1
+        checkers = (KNIGHT_ATTACKS[k] & theirs[KNIGHT]) | (PAWN_ATTACKS[color][k] & theirs[PAWN])
+        pins = {}
+        # Enemy sliders seen from the king through our own pieces
+        enemies = self.occupied[1 - color]
+        snipers = ((rook_attacks(k, enemies) & (theirs[ROOK] | theirs[QUEEN]))
+            | (bishop_attacks(k, enemies) & (theirs[BISHOP] | theirs[QUEEN])))
+        while snipers:
+            b = snipers & -snipers
+            snipers ^= b
+            between = BETWEEN[k][b.bit_length() - 1]
+            blockers = between & occupied
+            if not blockers:
+                checkers |= b
+            elif not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = between | b
+        return checkers, pins
+
+    def has_legal_move(self, color):
+        # Out of check any move of a piece that is not pinned is legal, look
+        # for one before generating all the moves
+        mine = self.pieces[color]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        checkers, pins = self.get_checkers_and_pins(color, occupied)
+        if not checkers:
+            free = ALL
+            for s in pins:
+                free ^= 1 << s
+            pawns = mine[PAWN] & free
+            if (pawns << 8 if color == WHITE else pawns >> 8) & ~occupied:
+                return True
+            targets = ~(self.occupied[color] | self.pieces[1 - color][KING])
+            for piece in (KNIGHT, BISHOP, ROOK, QUEEN):
+                bb = mine[piece] & free
+                while bb:
+                    b = bb & -bb
+                    bb ^= b
+                    s = b.bit_length() - 1
+                    if piece == KNIGHT:
+                        attacks = KNIGHT_ATTACKS[s]
+                    elif piece == BISHOP:
+                        attacks = bishop_attacks(s, occupied)
+                    elif piece == ROOK:
+                        attacks = rook_attacks(s, occupied)
+                    else:
+                        attacks = rook_attacks(s, occupied) | bishop_attacks(s, occupied)
+                    if attacks & targets:
+                        return True
+        return len(self.get_legal_moves(color)) > 0
+
+    def get_pseudo_legal_moves(self, color):
+        # Get possible moves without considering check situation
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        # Own pieces and the enemy king can not be captured
+        targets = ~(self.occupied[color] | self.pieces[1 - color][KING])
+        k = self.pieces[color][KING].bit_length() - 1
+        moves = []
+        self.add_moves(moves, KING, k, KING_ATTACKS[k] & targets)
+        moves += self.get_castling_moves(k, color, occupied)
+        self.add_piece_moves(moves, color, occupied, targets, ~occupied, None)
+        return moves
+
+    def get_capture_moves(self, color):
+        # Get the pseudo-legal captures and promotions only
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        targets = self.occupied[1 - color] & ~self.pieces[1 - color][KING]
+        k = self.pieces[color][KING].bit_length() - 1
+        moves = []
+        self.add_moves(moves, KING, k, KING_ATTACKS[k] & targets)
+        self.add_piece_moves(moves, color, occupied, targets, ~occupied & PROMOTION_ROWS, None)
+        return moves
+
+    def add_piece_moves(self, moves, color, occupied, targets, pushes, pins):
+        """
+        Add the moves of the pieces but the king ending on targets, pawn
+        pushes ending on pushes, and en passant captures
+        pins are the tiles each pinned piece can go to (None: no pins)
+        """
+        mine = self.pieces[color]
+        for piece in (KNIGHT, BISHOP, ROOK, QUEEN):
+            bb = mine[piece]
+            while bb:
+                b = bb & -bb
+                bb ^= b
+                s = b.bit_length() - 1
+                if piece == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[s]
+                elif piece == BISHOP:
+                    attacks = bishop_attacks(s, occupied)
+                elif piece == ROOK:
+                    attacks = rook_attacks(s, occupied)
+                else:
+                    attacks = rook_attacks(s, occupied) | bishop_attacks(s, occupied)
+                attacks &= targets
+                if pins and s in pins:
+                    attacks &= pins[s]
+                if attacks:
+                    self.add_moves(moves, piece, s, attacks)
+        # Pawns: all the pawns moving the same way at once
+        board = self.board
+        pawns = mine[PAWN]
+        empty = ~occupied
+        enemies = self.occupied[1 - color] & targets
+        if color == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_3) << 8) & empty
+            groups = ((single & pushes, 8), (double & pushes, 16),
+                ((pawns & ~FILE_A) << 7 & enemies, 7), ((pawns & ~FILE_H) << 9 & enemies, 9))
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_6) >> 8) & empty
+            groups = ((single & pushes, -8), (double & pushes, -16),
+                ((pawns & ~FILE_H) >> 7 & enemies, -7), ((pawns & ~FILE_A) >> 9 & enemies, -9))
+        for bb, delta in groups:
+            while bb:
+                b = bb & -bb
+                bb ^= b
+                t = b.bit_length() - 1
+                s = t - delta
+                if pins and s in pins and not pins[s] & b:
+                    continue
+                move = SQ120[s] | SQ120[t] << MOVE_SQ2_SHIFT | PAWN << MOVE_PIECE_SHIFT
+                target = board[t]
+                if target is not None:
+                    move |= target.piece << MOVE_CAPTURE_SHIFT
+                if b & PROMOTION_ROWS:
+                    moves += [move | p << MOVE_PROMOTE_SHIFT for p in PROMOTIONS]
+                else:
+                    moves.append(move)
+        # En passant (checked by playing it, see get_legal_moves)
+        if self.two_push_col[1 - color] >= 0:
+            t = (5 if color == WHITE else 2) * 8 + self.two_push_col[1 - color]
+            bb = PAWN_ATTACKS[1 - color][t] & pawns
+            while bb:
+                b = bb & -bb
+                bb ^= b
+                moves.append(SQ120[b.bit_length() - 1] | SQ120[t] << MOVE_SQ2_SHIFT | PAWN << MOVE_PIECE_SHIFT
+                    | PAWN << MOVE_CAPTURE_SHIFT | MOVE_EN_PASSANT)
+
+    def add_moves(self, moves, piece, s, targets):
+        board = self.board
+        move = SQ120[s] | piece << MOVE_PIECE_SHIFT
+        while targets:
+            b = targets & -targets
+            targets ^= b
+            t = b.bit_length() - 1
+            target = board[t]
+            if target is None:
+                moves.append(move | SQ120[t] << MOVE_SQ2_SHIFT)
+            else:
+                moves.append(move | SQ120[t] << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+
+    def get_castling_moves(self, s, color, occupied):
+        moves = []
+        sq = SQ120[s]
+        # Not out of check
+        if not (self.can_castle_kingside[color] or self.can_castle_queenside[color]) or self.is_tile_attacked(sq, color):
+            return moves
+        move = sq | KING << MOVE_PIECE_SHIFT
+        if self.can_castle_kingside[color]:
+            # King-side castling: the two tiles between king and rook are empty
+            if not occupied & (0b11 << (s + 1)) and self.pieces[color][ROOK] & (1 << (s + 3)):
+                if not self.is_tile_attacked(sq + 1, color) and not self.is_tile_attacked(sq + 2, color):
+                    moves.append(move | (sq + 2) << MOVE_SQ2_SHIFT | MOVE_CASTLE_KINGSIDE)
+        if self.can_castle_queenside[color]:
+            # Queen-side castling: the three tiles between king and rook are empty
+            if not occupied & (0b111 << (s - 3)) and self.pieces[color][ROOK] & (1 << (s - 4)):
+                if not self.is_tile_attacked(sq - 1, color) and not self.is_tile_attacked(sq - 2, color):
+                    moves.append(move | (sq - 2) << MOVE_SQ2_SHIFT | MOVE_CASTLE_QUEENSIDE)
+        return moves
+
+    def is_attacked(self, s, color, occupied):
+        # Is bit index s attacked by the enemies of color with that occupancy
+        enemy = self.pieces[1 - color]
+        if KNIGHT_ATTACKS[s] & enemy[KNIGHT]: return True
+        if PAWN_ATTACKS[color][s] & enemy[PAWN]: return True
+        if KING_ATTACKS[s] & enemy[KING]: return True
+        sliders = (enemy[ROOK] | enemy[QUEEN]) & ROOK_LINES[s]
+        if sliders and rook_attacks(s, occupied) & sliders: return True
+        sliders = (enemy[BISHOP] | enemy[QUEEN]) & BISHOP_LINES[s]
+        if sliders and bishop_attacks(s, occupied) & sliders: return True
+        return False
+
+    def is_tile_attacked(self, sq, color):
+        return self.is_attacked(SQ64[sq], color, self.occupied[WHITE] | self.occupied[BLACK])
+
+    def is_check(self, color):
+        # is_attacked inlined on the king bit index, is_check runs for every move searched
+        enemy = self.pieces[1 - color]
+        s = self.pieces[color][KING].bit_length() - 1
+        if KNIGHT_ATTACKS[s] & enemy[KNIGHT] or PAWN_ATTACKS[color][s] & enemy[PAWN] or KING_ATTACKS[s] & enemy[KING]:
+            return True
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        sliders = (enemy[ROOK] | enemy[QUEEN]) & ROOK_LINES[s]
+        if sliders and rook_attacks(s, occupied) & sliders: return True
+        sliders = (enemy[BISHOP] | enemy[QUEEN]) & BISHOP_LINES[s]
+        if sliders and bishop_attacks(s, occupied) & sliders: return True
+        return False
+
+    def get_mobility(self, color):
+        # Count the pseudo-legal moves from the attacks tables
+        mine = self.pieces[color]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        targets = ~self.occupied[color]
+        count = 0
+        for piece in (KNIGHT, KING, BISHOP, ROOK, QUEEN):
+            bb = mine[piece]
+            while bb:
+                b = bb & -bb
+                bb ^= b
+                s = b.bit_length() - 1
+                if piece == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[s]
+                elif piece == KING:
+                    attacks = KING_ATTACKS[s]
+                elif piece == BISHOP:
+                    attacks = bishop_attacks(s, occupied)
+                elif piece == ROOK:
+                    attacks = rook_attacks(s, occupied)
+                else:
+                    attacks = rook_attacks(s, occupied) | bishop_attacks(s, occupied)
+                count += bin(attacks & targets).count("1")
+        # Pawns: pushes and captures
+        pawns = mine[PAWN]
+        empty = ~occupied & ALL
+        if color == WHITE:
+            push = (pawns << 8) & empty
+            count += bin(push).count("1") + bin((push & 0xff0000) << 8 & empty).count("1")
+        else:
+            push = (pawns >> 8) & empty
+            count += bin(push).count("1") + bin((push & 0xff0000000000) >> 8 & empty).count("1")
+        enemies = self.occupied[1 - color]
+        while pawns:
+            b = pawns & -pawns
+            pawns ^= b
+            count += bin(PAWN_ATTACKS[color][b.bit_length() - 1] & enemies).count("1")
+        return count
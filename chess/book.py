@@ -0,0 +1,80 @@
+from .const import *
+from .polyglot import polyglot_key, decode_move
+
+import mmap
+import os
+import random
+import struct
+
+# Polyglot entry: key, move, weight, learn (big-endian, 16 bytes)
+ENTRY = struct.Struct(">QHHI")
+
+# Opening book class
+class OpeningBook:
+    """
+    Polyglot opening book (.bin file)
+    The file is memory-mapped on the first probe and entries, sorted by
+    key, are found by binary search
+    """
+
+    def __init__(self, path, rand = None):
+        self.path = path
+        self.map = None
+        self.size = 0
+        # Set once the file is read, an empty book has no map
+        self.opened = False
+        # Random generator for the move choice
+        self.random = rand or random.Random()
+
+    def open(self):
+        self.opened = True
+        with open(self.path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size // ENTRY.size
+            # A zero length file can not be mapped
+            if self.size:
+                self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.size = 0
+        self.opened = False
+
+    def get_entries(self, key):
+        """Return the list of (move, weight) stored for a Polyglot key"""
+        if not self.opened:
+            self.open()
+        if not self.size:
+            return []
+        # Binary search of the first entry with that key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if ENTRY.unpack_from(self.map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.size:
+            entry_key, move, weight, learn = ENTRY.unpack_from(self.map, low * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def get_move(self, position):
+        """
+        Return a book move (int) for the position, None if out of book
+        Moves are picked at random, in proportion to their weight
+        """
+        moves, weights = [], []
+        for code, weight in self.get_entries(polyglot_key(position)):
+            move = decode_move(position, code)
+            if move is not None and weight > 0:
+                moves.append(move)
+                weights.append(weight)
+        if not moves:
+            return None
+        return self.random.choices(moves, weights)[0]
@@ -6,12 +6,21 @@ BISHOP	= 3
 KNIGHT	= 4
 PAWN	= 5
 
+# Material value of each piece
+PIECE_VALUES	= 0, 100, 50, 30, 30, 10
+
 # Piece char for ascii representation
 PIECE_SHORT	= "K", "Q", "R", "B", "N", "P"
 
 # Piece code for algebric notation
 PIECE_ALG	= "K", "Q", "R", "B", "N", ""
 
+# Start position in Forsyth-Edwards Notation
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Pieces a pawn can be promoted to
+PROMOTIONS = (QUEEN, KNIGHT, ROOK, BISHOP)
+
 # Color constants
 BLACK = 0
 WHITE = 1
@@ -25,28 +34,81 @@ COMPUTER	= 1
 
 # Evaluation constants
 MATE		= 999999999
+# Mate scores are MATE minus the plies to the mate, beyond MATE_BOUND
+MATE_BOUND	= MATE - 1000
 INFINITY	= (MATE + 1)
 DRAW		= 0
+# Score of a position the endgame bitbases tell won (plus its evaluation)
+KNOWN_WIN	= 1000000
+
+# Board constants
+# The board is a 10x12 mailbox: the 8x8 tiles surrounded by off-board tiles
+# (two rows above and below so that knight jumps stay inside the board list)
+BOARD_SIZE = 120
+
+# Board index of each tile: SQUARES[row][col]
+SQUARES = tuple(tuple(21 + 10 * row + col for col in range(8)) for row in range(8))
+
+# Board indexes of the 64 tiles
+TILES = tuple(sq for row in SQUARES for sq in row)
+
+# Row and column of each board index, -1 for off-board indexes
+ROWS = tuple((sq // 10 - 2) if sq in TILES else -1 for sq in range(BOARD_SIZE))
+COLS = tuple((sq % 10 - 1) if sq in TILES else -1 for sq in range(BOARD_SIZE))
+
+# Some tiles
+A1, E1, H1 = SQUARES[0][0], SQUARES[0][4], SQUARES[0][7]
+A8, E8, H8 = SQUARES[7][0], SQUARES[7][4], SQUARES[7][7]
+
+# Color of off-board tiles (see piece.OFF)
+OFFBOARD = 2
+
+# Move constants (board index offsets)
+KING_MOVES = (-11, -10, -9, -1, +1, +9, +10, +11)
+
+KNIGHT_MOVES = (-21, -19, -12, -8, +8, +12, +19, +21)
+
+ROOK_DIRECTIONS = (-10, -1, +1, +10)
+
+BISHOP_DIRECTIONS = (-11, -9, +9, +11)
+
+# Precomputed targets of each board index (empty for off-board indexes)
+# Knight and king targets: on-board tiles one move away
+KNIGHT_TARGETS = tuple(tuple(sq + d for d in KNIGHT_MOVES if sq + d in TILES) if sq in TILES else () for sq in range(BOARD_SIZE))
+KING_TARGETS = tuple(tuple(sq + d for d in KING_MOVES if sq + d in TILES) if sq in TILES else () for sq in range(BOARD_SIZE))
+
+def _rays(sq, directions):
+    # Tiles of each direction ordered from sq to the board edge
+    rays = []
+    for d in directions:
+        ray = []
+        to = sq + d
+        while to in TILES:
+            ray.append(to)
+            to += d
+        if ray:
+            rays.append(tuple(ray))
+    return tuple(rays)
+
+# Sliding rays (only the ones with at least one tile)
+ROOK_RAYS = tuple(_rays(sq, ROOK_DIRECTIONS) if sq in TILES else () for sq in range(BOARD_SIZE))
+BISHOP_RAYS = tuple(_rays(sq, BISHOP_DIRECTIONS) if sq in TILES else () for sq in range(BOARD_SIZE))
+QUEEN_RAYS = tuple(r + b for r, b in zip(ROOK_RAYS, BISHOP_RAYS))
+
+# Move encoding
+# Search works on moves packed in an int (chess.move.Move is only used for notation):
+# bits 0-6 start board index, bits 7-13 end board index, bits 14-16 piece,
+# bits 17-19 captured piece (0 for none, a king is never captured),
+# bits 20-22 promotion piece (0 for none) then special move flags
+MOVE_SQ2_SHIFT          = 7
+MOVE_PIECE_SHIFT        = 14
+MOVE_CAPTURE_SHIFT      = 17
+MOVE_PROMOTE_SHIFT      = 20
+MOVE_EN_PASSANT         = 1 << 23
+MOVE_CASTLE_KINGSIDE    = 1 << 24
+MOVE_CASTLE_QUEENSIDE   = 1 << 25
 
-# Move constants
-KING_MOVES = (
-    (-1, -1),
-    (-1,  0),
-    (-1, +1),
-    ( 0, -1),
-    ( 0, +1),
-    (+1, -1),
-    (+1,  0),
-    (+1, +1)
-)
-
-KNIGHT_MOVES = (
-    (-2, -1),
-    (-2, +1),
-    (-1, -2),
-    (-1, +2),
-    (+1, -2),
-    (+1, +2),
-    (+2, -1),
-    (+2, +1)
-)
\ No newline at end of file
+# Transposition table entry flags
+EXACT		= 0
+LOWER		= 1
+UPPER		= 2
@@ -0,0 +1,33 @@
+import re
+
+# FEN and EPD files reading (see analyze.py and match.py)
+
+def read_positions(lines):
+    """
+    Yield (line number, fen, operations) for each FEN or EPD line
+    EPD operations (bm, id...) follow the 4 position fields: 'bm Nf3; id "x";'
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split(None, 4)
+        operations = {}
+        if len(fields) > 4:
+            rest = fields[4]
+            clocks = rest.split(None, 2)
+            if len(clocks) >= 2 and clocks[0].isdigit() and clocks[1].isdigit():
+                # FEN: halfmove clock and move number, nothing else
+                fen = " ".join(fields[:4] + clocks[:2])
+                rest = clocks[2] if len(clocks) > 2 else ""
+            else:
+                fen = " ".join(fields[:4])
+            # Operations end with ';' that may also be in a quoted operand
+            for operation in re.findall(r'(?:[^;"]|"[^"]*")+', rest):
+                operation = operation.strip()
+                if operation:
+                    opcode, _, operand = operation.partition(" ")
+                    operations[opcode] = operand.strip().strip('"')
+        else:
+            fen = line
+        yield number, fen, operations
@@ -1,9 +1,19 @@
 from .const import *
 from .move import Move
 from .position import Position
+from .timeman import TimeManager
+from .book import OpeningBook
+from .bitbase import Bitbases
 
 import re
-import winsound
+import threading
+import time
+
+try:
+	import winsound
+except ImportError:
+	# Only available on Windows
+	winsound = None
 
 HELP = """
 h: Show this help
@@ -20,14 +30,30 @@ MOVE: Play the move if valid
 """
 class Game:
 
-	def __init__(self, white = HUMAN, black = COMPUTER):
+	def __init__(self, white = HUMAN, black = COMPUTER, clock = 300, increment = 0, backend = Position, book = None, bitbases = None, ponder = True):
 		# Current position is regular start position
-		self.position = Position()
+		# backend is the position class (Position or BitboardPosition)
+		self.position = backend()
 		self.position.start()
+		# book is the path of a Polyglot opening book, only read when used
+		if book is not None:
+			self.position.book = OpeningBook(book)
+		# bitbases is the directory of the endgame bitbases files
+		if bitbases is not None:
+			self.position.bitbases = Bitbases(bitbases)
 		# List of moves is empty
 		self.moves = []
 		# Opponents, by default black opponent is computer and white is human
 		self.opponents = [black, white]
+		# Remaining time on each side clock and increment per move (seconds)
+		self.clocks = [clock, clock]
+		self.increment = increment
+		self.time_manager = TimeManager()
+		# Search the expected reply while a human opponent thinks
+		self.ponder = ponder
+		# Pondering state: (position, its hash, thread, stop event) and the move found
+		self.pondering = None
+		self.ponder_move = None
 		
 	def __str__(self):
 		s = ""
@@ -38,7 +64,7 @@ class Game:
 				s += str((i // 2) + 1)
 				s += ". "
 			# Move
-			s += str(m)
+			s += str(Move.decode(m))
 			s += "\t"
 		return s
 
@@ -47,6 +73,7 @@ class Game:
 			# Show current position
 			print(self.position)
 			# Get move
+			started = time.perf_counter()
 			if self.opponents[self.position.color_to_play] == HUMAN:
 				if len(self.position.get_legal_moves(self.position.color_to_play)) == 0:
 					print("{} wins !!".format(COLOR_NAMES[1 - self.position.color_to_play]))
@@ -54,16 +81,22 @@ class Game:
 				move = self.get_human_move()
 			else:
 				move = self.get_computer_move()
-				winsound.Beep(500, 2000)
+				if winsound:
+					winsound.Beep(500, 2000)
 				if not move:
 					print("{} wins !!".format(COLOR_NAMES[1 - self.position.color_to_play]))
 					quit()
+			# Update clock
+			self.clocks[self.position.color_to_play] += self.increment - (time.perf_counter() - started)
 			# Print move
-			print("{} move: {}".format(COLOR_NAMES[self.position.color_to_play], move))
+			print("{} move: {}".format(COLOR_NAMES[self.position.color_to_play], Move.decode(move)))
 			# Play move
 			self.position.play(move)
 			# Store move
 			self.moves.append(move)
+			# Think on the opponent time
+			if self.ponder and self.opponents[1 - self.position.color_to_play] == COMPUTER and self.opponents[self.position.color_to_play] == HUMAN:
+				self.start_pondering(move)
 
 	def get_human_move(self):
 		while 1:
@@ -74,7 +107,7 @@ class Game:
 				# Show legal moves
 				legal_moves = self.position.get_legal_moves(self.position.color_to_play)
 				for i, m in enumerate(legal_moves):
-					print(str(i + 1) + ": " + str(m))
+					print(str(i + 1) + ": " + str(Move.decode(m)))
 			elif s == "m":
 				# Show material value
 				print("Material value: " + str(self.position.get_material_value()))
@@ -85,10 +118,14 @@ class Game:
 				#  Show game moves
 				print(self)
 			elif s == "c":
-				# Let computer choose for me
-				print("Computer's advice: {}".format(self.position.get_best_move()))
+				# Let computer choose for me (not while the ponder search uses the tables)
+				self.cancel_pondering()
+				advice = self.position.get_best_move()
+				if advice:
+					print("Computer's advice: {}".format(Move.decode(advice)))
 			elif s == "u":
-				# Undo the last move
+				# Undo the last move, the ponder search is for another position
+				self.cancel_pondering()
 				self.position.unplay(self.moves.pop(-1))
 				# Undo the computer move if it played
 				if self.opponents[self.position.color_to_play] == COMPUTER:
@@ -107,9 +144,68 @@ class Game:
 				if move:
 					if self.position.resolve_move(move):
 						if self.position.check_move(move):
-							return move
+							return move.encode()
 						else:
 							print("Move {} is not legal".format(move))
 
 	def get_computer_move(self):
-		return self.position.get_best_move()
+		max_time = self.time_manager.allocate(self.clocks[self.position.color_to_play], self.increment)
+		if self.pondering is not None:
+			position, key, thread, stop_event = self.pondering
+			self.pondering = None
+			if key == self.position.hash:
+				# The opponent played the expected move: the ponder search
+				# goes on, now on our own clock
+				timer = threading.Timer(max_time, stop_event.set)
+				timer.start()
+				thread.join()
+				timer.cancel()
+				if self.ponder_move is not None:
+					print("Ponder hit")
+					self.position.pv = position.pv
+					return self.ponder_move
+			else:
+				self.stop_pondering(position, thread, stop_event)
+		return self.position.get_best_move(max_time)
+
+	def start_pondering(self, move):
+		# The expected reply is the second move of the principal variation
+		pv = self.position.pv
+		if len(pv) < 2 or pv[0] != move:
+			return
+		position = type(self.position)()
+		position.set_fen(self.position.get_fen())
+		if pv[1] not in position.get_legal_moves(position.color_to_play):
+			return
+		position.play(pv[1])
+		# Share the search tables so a missed ponder search still helps
+		position.tt = self.position.tt
+		position.book = self.position.book
+		position.bitbases = self.position.bitbases
+		# Do not print the search progress while the opponent types
+		position.on_depth = lambda depth, score, pv, stats: None
+		stop_event = threading.Event()
+		position.stop_event = stop_event
+		self.ponder_move = None
+		thread = threading.Thread(target = self.ponder_search, args = (position,), daemon = True)
+		# The position hash changes while it is searched, keep the one to expect
+		self.pondering = (position, position.hash, thread, stop_event)
+		thread.start()
+
+	def ponder_search(self, position):
+		# Run on the ponder thread until stopped, without the opening book
+		# (it prints its moves)
+		self.ponder_move = position.get_best_move_iterative()
+
+	def cancel_pondering(self):
+		# Stop the ponder search, if any, before a search on the game position
+		if self.pondering is not None:
+			position, key, thread, stop_event = self.pondering
+			self.pondering = None
+			self.stop_pondering(position, thread, stop_event)
+
+	def stop_pondering(self, position, thread, stop_event):
+		stop_event.set()
+		# Stop now, without waiting for the next search limits check
+		position.stopped = True
+		thread.join()
@@ -3,57 +3,90 @@ from .const import *
 import re
 
 # Move class
+# Generation and search work on moves encoded as ints (see const.MOVE_*)
+# a Move is only built to parse or print a move
 class Move:
 
-    def __init__(   self, piece, row2, col2, row1 = None, col1 = None,
+    __slots__ = ("piece", "sq2", "sq1", "capture", "check", "promote", "en_passant", "castling")
+
+    def __init__(   self, piece, sq2, sq1 = None,
                     capture = None, check = False, promote = None,
                     en_passant = False, castling = None):
+        """
+        sq1 and sq2 are the start and end board indexes (see const.SQUARES)
+        """
         # Assertions
         assert piece in range(6)
-        assert row2 in range(8)
-        assert col2 in range(8)
-        assert row1 != row2 or col1 != col2
+        assert ROWS[sq2] >= 0
+        assert sq1 is None or ROWS[sq1] >= 0
+        assert sq1 != sq2
         assert not capture or capture in range(6)
         assert not promote or promote in (QUEEN, KNIGHT, ROOK, BISHOP)
-        assert not castling or (piece == KING and row1 in (0,7) and row1 == row2 
-            and col1 == 4 and col2 in (2, 6) and castling in (KING, QUEEN))
+        assert not castling or (piece == KING and sq1 in (E1, E8)
+            and sq2 in (sq1 - 2, sq1 + 2) and castling in (KING, QUEEN))
         # Assignments
         self.piece                     = piece
-        self.row2                      = row2
-        self.col2                      = col2
-        self.row1                      = row1
-        self.col1                      = col1
+        self.sq2                       = sq2
+        self.sq1                       = sq1
         self.capture                   = capture
         self.check                     = check
         self.promote                   = promote
         self.en_passant                = en_passant
         self.castling                  = castling
-        self.prevents_castle_kingside  = False
-        self.prevents_castle_queenside = False
-        self.two_push_col_was          = -1
 
-    def copy(self):
-        """
-        Copy a move
-        Since this is done only when promoting a pawn some attributes are not copied
-        See Position.get_moves_for_pawn
-        """
-        copy = Move(
-            self.piece,
-            self.row2,
-            self.col2,
-            self.row1,
-            self.col1,
-            self.capture,
-            self.check
+    @property
+    def row1(self):
+        return None if self.sq1 is None else ROWS[self.sq1]
+
+    @property
+    def col1(self):
+        return None if self.sq1 is None else COLS[self.sq1]
+
+    @property
+    def row2(self):
+        return ROWS[self.sq2]
+
+    @property
+    def col2(self):
+        return COLS[self.sq2]
+
+    def encode(self):
+        """Return the move packed in an int (the move must be resolved)"""
+        code = (self.sq1 | self.sq2 << MOVE_SQ2_SHIFT | self.piece << MOVE_PIECE_SHIFT
+            | (self.capture or 0) << MOVE_CAPTURE_SHIFT | (self.promote or 0) << MOVE_PROMOTE_SHIFT)
+        if self.en_passant:
+            code |= MOVE_EN_PASSANT
+        if self.castling == KING:
+            code |= MOVE_CASTLE_KINGSIDE
+        elif self.castling == QUEEN:
+            code |= MOVE_CASTLE_QUEENSIDE
+        return code
+
+    @staticmethod
+    def decode(code):
+        """Build a move from its int encoding"""
+        capture = code >> MOVE_CAPTURE_SHIFT & 7
+        promote = code >> MOVE_PROMOTE_SHIFT & 7
+        if code & MOVE_CASTLE_KINGSIDE:
+            castling = KING
+        elif code & MOVE_CASTLE_QUEENSIDE:
+            castling = QUEEN
+        else:
+            castling = None
+        return Move(
+            code >> MOVE_PIECE_SHIFT & 7,
+            code >> MOVE_SQ2_SHIFT & 127,
+            code & 127,
+            capture or None,
+            promote = promote or None,
+            en_passant = bool(code & MOVE_EN_PASSANT),
+            castling = castling
             )
-        return copy
 
     def fill(self, other):
         # Used by Position.resolve_move
         self.piece      = other.piece
-        self.row1       = other.row1
-        self.col1       = other.col1
+        self.sq1        = other.sq1
         self.capture    = other.capture
         self.check      = other.check
         self.promote    = other.promote
@@ -94,10 +127,8 @@ class Move:
         return s
 
     def __eq__(self, other):
-        if self.row1 != other.row1: return False
-        if self.col1 != other.col1: return False
-        if self.row2 != other.row2: return False
-        if self.col2 != other.col2: return False
+        if self.sq1 != other.sq1: return False
+        if self.sq2 != other.sq2: return False
         if self.promote != other.promote: return False
         return True
 
@@ -114,21 +145,17 @@ class Move:
             if match.group("end"):
                 start = match.group("startorend")
                 end = match.group("end")
-                row1 = int(start[1]) - 1
-                col1 = "abcdefgh".index(start[0])
-                row2 = int(end[1]) - 1
-                col2 = "abcdefgh".index(end[0])
+                sq1 = SQUARES[int(start[1]) - 1]["abcdefgh".index(start[0])]
+                sq2 = SQUARES[int(end[1]) - 1]["abcdefgh".index(end[0])]
             else:
                 end = match.group("startorend")
-                row1 = None
-                col1 = None
-                row2 = int(end[1]) - 1
-                col2 = "abcdefgh".index(end[0])
+                sq1 = None
+                sq2 = SQUARES[int(end[1]) - 1]["abcdefgh".index(end[0])]
             # Get promotion
             if match.group("prom"):
                 prom = "KQRBN".index(match.group("prom"))
             else:
                 prom = None
             # Instanciate Move
-            m = Move(piece, row2, col2, row1, col1, promote = prom)
+            m = Move(piece, sq2, sq1, promote = prom)
             return m
@@ -0,0 +1,61 @@
+from .const import *
+
+# Attacker rank for least valuable attacker, the king comes last
+ATTACKER_RANK = (6, 5, 4, 3, 2, 1)
+
+# Move scores: captures and promotions, then killers, then history
+CAPTURE_SCORE = 1 << 30
+KILLER_SCORE = 1 << 29
+
+# Move ordering class
+class MoveOrdering:
+    """
+    Sort the moves so alpha-beta gets its cutoffs early
+    * Captures by most valuable victim / least valuable attacker (MVV-LVA)
+    * Two killer moves per ply (quiet moves that caused a beta cutoff)
+    * History heuristic: quiet moves cutoffs by from/to squares
+    """
+
+    def __init__(self, max_ply = 128):
+        self.max_ply = max_ply
+        self.clear()
+
+    def clear(self):
+        self.killers = [[0, 0] for i in range(self.max_ply)]
+        self.history = [0] * (BOARD_SIZE * BOARD_SIZE)
+
+    def score(self, move, ply):
+        capture = move >> MOVE_CAPTURE_SHIFT & 7
+        promote = move >> MOVE_PROMOTE_SHIFT & 7
+        if capture or promote:
+            score = CAPTURE_SCORE + PIECE_VALUES[promote] * 16
+            if capture:
+                score += PIECE_VALUES[capture] * 16 + ATTACKER_RANK[move >> MOVE_PIECE_SHIFT & 7]
+            return score
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+        return self.history[(move & 127) * BOARD_SIZE + (move >> MOVE_SQ2_SHIFT & 127)]
+
+    def sort(self, moves, ply):
+        """Sort the moves in place, best first"""
+        moves.sort(key = lambda m: self.score(m, ply), reverse = True)
+
+    def cutoff(self, move, depth, ply):
+        """Record a move that caused a beta cutoff"""
+        # Captures and promotions are already searched first
+        if move >> MOVE_CAPTURE_SHIFT & 7 or move >> MOVE_PROMOTE_SHIFT & 7:
+            return
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        index = (move & 127) * BOARD_SIZE + (move >> MOVE_SQ2_SHIFT & 127)
+        self.history[index] += depth * depth
+        # Keep history below killers
+        if self.history[index] >= KILLER_SCORE:
+            self.history = [h // 2 for h in self.history]
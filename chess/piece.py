@@ -1,11 +1,24 @@
 from .const import *
 
 # Piece class
+# Pieces are immutable and shared: there is one instance per color and
+# piece type (see get_instance), boards just point to them
 class Piece:
 
+	__slots__ = ("color", "piece")
+
 	def __init__(self, color, piece):
-		self.color = color
-		self.piece = piece
+		object.__setattr__(self, "color", color)
+		object.__setattr__(self, "piece", piece)
+
+	def __setattr__(self, name, value):
+		raise AttributeError("pieces are shared, they can not be changed")
+
+	def __reduce__(self):
+		# Unpickle to the shared instances
+		if self.piece is None:
+			return "OFF"
+		return (Piece.get_instance, (self.color, self.piece))
 
 	def __eq__(self, other):
 		return isinstance(other, Piece) and self.piece == other.piece and self.color == other.color
@@ -21,7 +34,7 @@ class Piece:
 
 	@staticmethod
 	def get_instance(color, piece):
-		return (King, Queen, Rook, Bishop, Knight, Pawn)[piece](color)
+		return INSTANCES[color][piece]
 
 	def get_material_value(self):
 		raise NotImplementedError
@@ -29,59 +42,66 @@ class Piece:
 
 # King class
 class King(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, KING)
 	def get_material_value(self):
-		return 0
+		return PIECE_VALUES[KING]
 
 
 # Queen class
 class Queen(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, QUEEN)
 	def get_material_value(self):
-		return 100
+		return PIECE_VALUES[QUEEN]
 
 
 # Rook class
 class Rook(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, ROOK)
 	def get_material_value(self):
-		return 50
+		return PIECE_VALUES[ROOK]
 
 
 # Bishop class
 class Bishop(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, BISHOP)
 	def get_material_value(self):
-		return 30
+		return PIECE_VALUES[BISHOP]
 
 
 # Knight class
 class Knight(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, KNIGHT)
 	def get_material_value(self):
-		return 30
+		return PIECE_VALUES[KNIGHT]
 
 
 # Pawn class
 class Pawn(Piece):
+	__slots__ = ()
 	def __init__(self, color):
 		super().__init__(color, PAWN)
 	def get_material_value(self):
-		return 10
+		return PIECE_VALUES[PAWN]
 	def promote(self, piece):
-		if piece == QUEEN:
-			return Queen(self.color)
-		elif piece == KNIGHT:
-			return Knight(self.color)
-		elif piece == ROOK:
-			return Rook(self.color)
-		elif piece == BISHOP:
-			return Bishop(self.color)
-		else:
+		if piece not in PROMOTIONS:
 			raise ValueError
+		return INSTANCES[self.color][piece]
+
+
+# Shared instances: INSTANCES[color][piece]
+INSTANCES = tuple(tuple(cls(color) for cls in (King, Queen, Rook, Bishop, Knight, Pawn)) for color in (BLACK, WHITE))
+
 
+# Off-board tile sentinel of the 10x12 board
+# Its color is neither black nor white so it is never empty nor capturable
+OFF = Piece(OFFBOARD, None)
@@ -1,72 +1,218 @@
 from .const import *
 from .piece import *
 from .move import *
+from .zobrist import *
+from .pst import PST
+from .tt import TranspositionTable
+from .ordering import MoveOrdering, KILLER_SCORE
+from .stats import SearchStats
+from . import smp
+
+import time
+
+def _score_to_tt(score, ply):
+    # Mate scores are stored from the position, not from the root
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+def _score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+# Attributes not sent to other processes: search tables and hooks
+NOT_PICKLED = ("tt", "ordering", "stop_event", "book", "bitbases", "on_depth")
 
 # Position class
 class Position:
 
+    __slots__ = (
+        # Board (see set_pieces)
+        "tiles", "piece_squares", "king_square", "color_to_play", "can_castle_kingside",
+        "can_castle_queenside", "two_push_col", "history", "hash", "material", "positional", "start_ply",
+        # Search (see __init__)
+        "tt", "ordering", "nodes", "stopped", "deadline", "max_nodes", "pv", "score", "follow_pv",
+        "root_piece_count", "stats", "on_depth", "stop_event", "book", "bitbases",
+        "null_move_reduction", "late_move_reduction", "late_move_count", "aspiration_window")
+
+    def __init__(self):
+        # Transposition table used by negamax
+        self.tt = TranspositionTable()
+        # Killer moves and history heuristic used by negamax
+        self.ordering = MoveOrdering()
+        # Search state (see negamax)
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.max_nodes = None
+        self.pv = ()
+        self.score = None
+        self.follow_pv = False
+        self.root_piece_count = 0
+        # Counters of the last search (see stats)
+        self.stats = SearchStats()
+        # Called with (depth, score, pv, stats) instead of printing each time
+        # a depth is searched (see report_depth)
+        self.on_depth = None
+        # Set by another process to stop the search (see smp)
+        self.stop_event = None
+        # Plies played before the position set (see set_fen)
+        self.start_ply = 0
+        # Opening book consulted by get_best_move (see book)
+        self.book = None
+        # Endgame bitbases probed by negamax (see bitbase)
+        self.bitbases = None
+        # Pruning (see negamax), 0 turns it off
+        # Null move: depth reduction of the search after passing the turn
+        self.null_move_reduction = 2
+        # Late moves: depth reduction of the quiet moves searched after
+        # the first late_move_count ones
+        self.late_move_reduction = 1
+        self.late_move_count = 3
+        # Aspiration: half width of the first window around the previous
+        # depth score (see get_best_move_iterative)
+        self.aspiration_window = 15
+
+    def __getstate__(self):
+        # Search tables are not sent to other processes
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name not in NOT_PICKLED and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def start(self):
         """Initialize to regular start position"""
-        self.color_to_play = WHITE
+        self.set_fen(START_FEN)
+
+    def set_fen(self, fen):
+        """Initialize from a position in Forsyth-Edwards Notation"""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError("Invalid FEN: {}".format(fen))
+        placement, color, castling, en_passant = fields[:4]
+        self.color_to_play = WHITE if color == "w" else BLACK
+        # Plies played before this position (for the move number)
+        number = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+        self.start_ply = 2 * (max(number, 1) - 1) + (1 if self.color_to_play == BLACK else 0)
         # Castling flags
-        self.can_castle_kingside    = [True, True]
-        self.can_castle_queenside   = [True, True]
+        self.can_castle_kingside    = ["k" in castling, "K" in castling]
+        self.can_castle_queenside   = ["q" in castling, "Q" in castling]
         # Last move two-push pawn move column
         self.two_push_col = [-1, -1]
-        # The position is a list of rows
-        # a row is a list of pieces
-        # Define first row (white pieces)
-        row0 = [
-            Rook(WHITE),
-            Knight(WHITE),
-            Bishop(WHITE),
-            Queen(WHITE),
-            King(WHITE),
-            Bishop(WHITE),
-            Knight(WHITE),
-            Rook(WHITE),
-        ]
-        # Define second row (white pawns)
-        row1 = []
-        for c in range(8):
-            row1.append(Pawn(WHITE))
-        # Define seventh row (black pawns)
-        row6 = []
-        for c in range(8):
-            row6.append(Pawn(BLACK))
-        # Define last row (black pieces)
-        row7 = [
-            Rook(BLACK),
-            Knight(BLACK),
-            Bishop(BLACK),
-            Queen(BLACK),
-            King(BLACK),
-            Bishop(BLACK),
-            Knight(BLACK),
-            Rook(BLACK),
-        ]
-        self.tiles = [
-            row0,
-            row1,
-            [None] * 8,
-            [None] * 8,
-            [None] * 8,
-            [None] * 8,
-            row6,
-            row7,
-        ]
+        if en_passant != "-":
+            self.two_push_col[1 - self.color_to_play] = "abcdefgh".index(en_passant[0])
+        # Pieces on each tile, row by row from a1 to h8
+        pieces = [None] * 64
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise ValueError("Invalid FEN: {}".format(fen))
+        for i, s in enumerate(rows):
+            row, col = 7 - i, 0
+            for c in s:
+                if c.isdigit():
+                    col += int(c)
+                else:
+                    pieces[row * 8 + col] = Piece.get_instance(WHITE if c.isupper() else BLACK, PIECE_SHORT.index(c.upper()))
+                    col += 1
+        self.set_pieces(pieces)
+
+    def get_fen(self):
+        """
+        Return the position in Forsyth-Edwards Notation
+        The halfmove clock is not kept, it is always 0
+        """
+        pieces = self.get_pieces()
+        rows = []
+        for row in range(7, -1, -1):
+            s, empty = "", 0
+            for col in range(8):
+                piece = pieces[row * 8 + col]
+                if piece is None:
+                    empty += 1
+                else:
+                    if empty:
+                        s += str(empty)
+                        empty = 0
+                    s += piece.short_str()
+            if empty:
+                s += str(empty)
+            rows.append(s)
+        castling = ""
+        if self.can_castle_kingside[WHITE]: castling += "K"
+        if self.can_castle_queenside[WHITE]: castling += "Q"
+        if self.can_castle_kingside[BLACK]: castling += "k"
+        if self.can_castle_queenside[BLACK]: castling += "q"
+        # The tile behind the pawn that just moved two tiles
+        col = self.two_push_col[1 - self.color_to_play]
+        if col >= 0:
+            en_passant = "abcdefgh"[col] + ("6" if self.color_to_play == WHITE else "3")
+        else:
+            en_passant = "-"
+        number = (self.start_ply + len(self.history)) // 2 + 1
+        return "{} {} {} {} 0 {}".format("/".join(rows), "w" if self.color_to_play == WHITE else "b",
+            castling or "-", en_passant, number)
+
+    def set_pieces(self, pieces):
+        """
+        Put the pieces on the board
+        pieces is the list of the 64 tiles content, row by row from a1 to h8
+        """
+        # The position is a 10x12 list of tiles (see const.SQUARES)
+        # holding a piece, None for an empty tile or OFF outside the board
+        self.tiles = [OFF] * BOARD_SIZE
         # King position
-        self.king_row = [7, 0]
-        self.king_col = [4, 4]
+        self.king_square = [None, None]
+        # Pieces lists: board indexes of each color pieces
+        self.piece_squares = [set(), set()]
+        # What play stores for unplay
+        self.history = []
+        for sq, piece in zip(TILES, pieces):
+            self.tiles[sq] = piece
+            if piece is not None:
+                self.piece_squares[piece.color].add(sq)
+                if piece.piece == KING:
+                    self.king_square[piece.color] = sq
+        # Zobrist hash
+        self.hash = self.compute_hash()
+        # Material and positional scores (White - Black)
+        self.material, self.positional = self.compute_scores()
+
+    def get_pieces(self):
+        """Return the list of the 64 tiles content, row by row from a1 to h8"""
+        return [self.tiles[sq] for sq in TILES]
+
+    def get_piece_count(self):
+        return len(self.piece_squares[WHITE]) + len(self.piece_squares[BLACK])
+
+    def has_piece(self, color):
+        # Any piece but the king and pawns
+        tiles = self.tiles
+        for sq in self.piece_squares[color]:
+            if tiles[sq].piece != PAWN and tiles[sq].piece != KING:
+                return True
+        return False
 
     def __str__(self):
         s = "\n"
         for row in range(7, -1, -1):
             for col in range(8):
-                if self.tiles[row][col] is None:
+                piece = self.tiles[SQUARES[row][col]]
+                if piece is None:
                     s += "-"
                 else:
-                    s += self.tiles[row][col].short_str()
+                    s += piece.short_str()
             s += "\n"
         s += "\n" + COLOR_NAMES[self.color_to_play] + " to play"
         if self.is_check(self.color_to_play):
@@ -83,129 +229,238 @@ class Position:
         return True
 
     def key(self):
-        # Generate a key to identify a position in a dictionnary
-        return (self.color_to_play,) + tuple(self.can_castle_queenside) + tuple(self.can_castle_kingside) + tuple(self.two_push_col) + tuple(tuple(row) for row in self.tiles)
+        # Key to identify a position in a dictionnary (see play/unplay)
+        return self.hash
+
+    def compute_hash(self):
+        """
+        Compute the Zobrist hash from scratch
+        play and unplay then keep it up to date incrementally
+        """
+        h = 0
+        for sq in TILES:
+            piece = self.tiles[sq]
+            if piece is not None:
+                h ^= ZOBRIST_PIECE[piece.color][piece.piece][sq]
+        for color in (BLACK, WHITE):
+            if self.can_castle_kingside[color]:
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+            if self.can_castle_queenside[color]:
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+            if self.two_push_col[color] >= 0:
+                h ^= ZOBRIST_EN_PASSANT[self.two_push_col[color]]
+        if self.color_to_play == WHITE:
+            h ^= ZOBRIST_WHITE_TO_PLAY
+        return h
+
+    def compute_scores(self):
+        """
+        Compute the material and positional scores (White - Black) from scratch
+        play and unplay then keep them up to date incrementally
+        """
+        material, positional = 0, 0
+        for sq in TILES:
+            piece = self.tiles[sq]
+            if piece is not None:
+                sign = 1 if piece.color == WHITE else -1
+                material += sign * PIECE_VALUES[piece.piece]
+                positional += sign * PST[piece.color][piece.piece][sq]
+        return material, positional
 
     def play(self, move):
         """
-        Play a move
+        Play a move (encoded as an int, see const.MOVE_*)
         """
-        color = self.tiles[move.row1][move.col1].color
+        tiles = self.tiles
+        sq1 = move & 127
+        sq2 = move >> MOVE_SQ2_SHIFT & 127
+        piece = move >> MOVE_PIECE_SHIFT & 7
+        capture = move >> MOVE_CAPTURE_SHIFT & 7
+        promote = move >> MOVE_PROMOTE_SHIFT & 7
+        color = tiles[sq1].color
+        # Store what the move can not tell so this can be restored on unplay
+        self.history.append((self.hash, self.two_push_col[1 - color],
+            self.can_castle_kingside[color], self.can_castle_queenside[color],
+            self.can_castle_kingside[1 - color], self.can_castle_queenside[1 - color],
+            self.material, self.positional))
+        h = self.hash ^ ZOBRIST_WHITE_TO_PLAY
+        keys = ZOBRIST_PIECE[color]
+        h ^= keys[piece][sq1]
+        # Material and positional deltas from the color point of view
+        pst, their_pst = PST[color], PST[1 - color]
+        material = 0
+        positional = pst[promote or piece][sq2] - pst[piece][sq1]
+        mine, theirs = self.piece_squares[color], self.piece_squares[1 - color]
+        # Captured piece
+        if capture and not move & MOVE_EN_PASSANT:
+            theirs.remove(sq2)
+            h ^= ZOBRIST_PIECE[1 - color][capture][sq2]
+            material += PIECE_VALUES[capture]
+            positional += their_pst[capture][sq2]
         # Fill end tile
-        self.tiles[move.row2][move.col2] = self.tiles[move.row1][move.col1]
+        tiles[sq2] = tiles[sq1]
         # Empty start tile
-        self.tiles[move.row1][move.col1] = None
+        tiles[sq1] = None
+        mine.remove(sq1)
+        mine.add(sq2)
         # En Passant
-        if move.en_passant:
-            assert move.piece == PAWN
-            if color == WHITE:
-                assert move.row2 == 5
-                self.tiles[4][move.col2] = None
-            else:
-                assert move.row2 == 2
-                self.tiles[3][move.col2] = None
+        if move & MOVE_EN_PASSANT:
+            # The captured pawn is behind the end tile
+            sq = sq2 - 10 if color == WHITE else sq2 + 10
+            tiles[sq] = None
+            theirs.remove(sq)
+            h ^= ZOBRIST_PIECE[1 - color][PAWN][sq]
+            material += PIECE_VALUES[PAWN]
+            positional += their_pst[PAWN][sq]
         # Promotion
-        elif move.promote:
-            assert move.piece == PAWN
-            self.tiles[move.row2][move.col2] = self.tiles[move.row2][move.col2].promote(move.promote)
+        elif promote:
+            tiles[sq2] = tiles[sq2].promote(promote)
+            material += PIECE_VALUES[promote] - PIECE_VALUES[PAWN]
         # Castling
-        elif move.castling is not None:
-            assert move.piece == KING
-            if move.castling == KING:
-                # Move king-side rook
-                self.tiles[move.row1][5], self.tiles[move.row1][7] = self.tiles[move.row1][7], self.tiles[move.row1][5]
-            elif move.castling == QUEEN:
-                # Move queen-side rook
-                self.tiles[move.row1][0], self.tiles[move.row1][3] = self.tiles[move.row1][3], self.tiles[move.row1][0]
+        elif move & MOVE_CASTLE_KINGSIDE:
+            # Move king-side rook
+            tiles[sq1 + 1], tiles[sq1 + 3] = tiles[sq1 + 3], tiles[sq1 + 1]
+            mine.remove(sq1 + 3)
+            mine.add(sq1 + 1)
+            h ^= keys[ROOK][sq1 + 1] ^ keys[ROOK][sq1 + 3]
+            positional += pst[ROOK][sq1 + 1] - pst[ROOK][sq1 + 3]
+        elif move & MOVE_CASTLE_QUEENSIDE:
+            # Move queen-side rook
+            tiles[sq1 - 4], tiles[sq1 - 1] = tiles[sq1 - 1], tiles[sq1 - 4]
+            mine.remove(sq1 - 4)
+            mine.add(sq1 - 1)
+            h ^= keys[ROOK][sq1 - 4] ^ keys[ROOK][sq1 - 1]
+            positional += pst[ROOK][sq1 - 1] - pst[ROOK][sq1 - 4]
+        h ^= keys[promote or piece][sq2]
+        if color == WHITE:
+            self.material += material
+            self.positional += positional
+        else:
+            self.material -= material
+            self.positional -= positional
         # Special moves stuff
-        if self.two_push_col[color] >= 0:
-            # Store two push col in mmove so this can be restore on unplay
-            move.two_push_col_was = self.two_push_col[color]
-            self.two_push_col[color] = -1
         # Always reset bad side two-push
-        self.two_push_col[1 - color] = -1
-        if move.piece == PAWN:
-            if abs(move.row1 - move.row2) == 2:
+        if self.two_push_col[1 - color] >= 0:
+            h ^= ZOBRIST_EN_PASSANT[self.two_push_col[1 - color]]
+            self.two_push_col[1 - color] = -1
+        if piece == PAWN:
+            if sq2 - sq1 in (20, -20):
                 # Means that next move may be "en passant"
-                self.two_push_col[color] = move.col1
-        elif move.piece == ROOK:
-            if move.col1 == 0 and self.can_castle_queenside[color]:
+                self.two_push_col[color] = COLS[sq1]
+                h ^= ZOBRIST_EN_PASSANT[COLS[sq1]]
+        elif piece == ROOK:
+            if sq1 == (A1 if color == WHITE else A8) and self.can_castle_queenside[color]:
                 # Moving this rook makes queen-side castling impossible
                 self.can_castle_queenside[color] = False
-                move.prevents_castle_queenside = True
-            elif move.col1 == 7 and self.can_castle_kingside[color]:
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+            elif sq1 == (H1 if color == WHITE else H8) and self.can_castle_kingside[color]:
                 # Moving this rook makes king-side castling impossible
                 self.can_castle_kingside[color] = False
-                move.prevents_castle_kingside = True
-        elif move.piece == KING:
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+        elif piece == KING:
             # Keep track of kings positions (see is_check)
-            self.king_row[color] = move.row2
-            self.king_col[color] = move.col2
-            if move.col1 == 4:
-                # Moving the king makes castling impossible both sides
-                if self.can_castle_kingside[color]:
-                    self.can_castle_kingside[color] = False
-                    move.prevents_castle_kingside = True
-                if self.can_castle_queenside[color]:
-                    self.can_castle_queenside[color] = False
-                    move.prevents_castle_queenside = True
+            self.king_square[color] = sq2
+            # Moving the king makes castling impossible both sides
+            if self.can_castle_kingside[color]:
+                self.can_castle_kingside[color] = False
+                h ^= ZOBRIST_CASTLE_KINGSIDE[color]
+            if self.can_castle_queenside[color]:
+                self.can_castle_queenside[color] = False
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[color]
+        # Capturing a rook on its start tile makes castling impossible on that side
+        if capture == ROOK:
+            if sq2 == (A8 if color == WHITE else A1) and self.can_castle_queenside[1 - color]:
+                self.can_castle_queenside[1 - color] = False
+                h ^= ZOBRIST_CASTLE_QUEENSIDE[1 - color]
+            elif sq2 == (H8 if color == WHITE else H1) and self.can_castle_kingside[1 - color]:
+                self.can_castle_kingside[1 - color] = False
+                h ^= ZOBRIST_CASTLE_KINGSIDE[1 - color]
         # Swap color to play 
         self.color_to_play = (1 - self.color_to_play)
+        self.hash = h
 
     def unplay(self, move):
         """
-        Unplay a move
+        Unplay a move (the last one played)
         """
-        color = self.tiles[move.row2][move.col2].color
+        tiles = self.tiles
+        sq1 = move & 127
+        sq2 = move >> MOVE_SQ2_SHIFT & 127
+        capture = move >> MOVE_CAPTURE_SHIFT & 7
+        color = tiles[sq2].color
+        mine, theirs = self.piece_squares[color], self.piece_squares[1 - color]
         # Fill start tile
-        self.tiles[move.row1][move.col1] = self.tiles[move.row2][move.col2]
-        # Empty or fill end tile
-        if move.capture is None or move.en_passant:
-            self.tiles[move.row2][move.col2] = None
-        else:
-            self.tiles[move.row2][move.col2] = Piece.get_instance(1 - color, move.capture)
+        tiles[sq1] = tiles[sq2]
+        mine.remove(sq2)
+        mine.add(sq1)
         # En Passant
-        if move.en_passant:
-            assert move.capture == PAWN
+        if move & MOVE_EN_PASSANT:
+            tiles[sq2] = None
             if color == WHITE:
-                assert move.row2 == 5
-                self.tiles[4][move.col2] = Pawn(1 - color)
+                tiles[sq2 - 10] = INSTANCES[1 - color][PAWN]
+                theirs.add(sq2 - 10)
             else:
-                assert move.row2 == 2
-                self.tiles[3][move.col2] = Pawn(1 - color)
-        # Promotion
-        elif move.promote:
-            self.tiles[move.row1][move.col1] = Pawn(color)
-        # Castling
-        elif move.castling is not None:
-            if move.castling == KING:
+                tiles[sq2 + 10] = INSTANCES[1 - color][PAWN]
+                theirs.add(sq2 + 10)
+        else:
+            # Empty or fill end tile
+            if capture:
+                tiles[sq2] = INSTANCES[1 - color][capture]
+                theirs.add(sq2)
+            else:
+                tiles[sq2] = None
+            # Promotion
+            if move >> MOVE_PROMOTE_SHIFT & 7:
+                tiles[sq1] = INSTANCES[color][PAWN]
+            # Castling
+            elif move & MOVE_CASTLE_KINGSIDE:
                 # Move king-side rook
-                self.tiles[move.row1][5], self.tiles[move.row1][7] = self.tiles[move.row1][7], self.tiles[move.row1][5]
-            elif move.castling == QUEEN:
+                tiles[sq1 + 1], tiles[sq1 + 3] = tiles[sq1 + 3], tiles[sq1 + 1]
+                mine.remove(sq1 + 1)
+                mine.add(sq1 + 3)
+            elif move & MOVE_CASTLE_QUEENSIDE:
                 # Move queen-side rook
-                self.tiles[move.row1][0], self.tiles[move.row1][3] = self.tiles[move.row1][3], self.tiles[move.row1][0]
+                tiles[sq1 - 4], tiles[sq1 - 1] = tiles[sq1 - 1], tiles[sq1 - 4]
+                mine.remove(sq1 - 1)
+                mine.add(sq1 - 4)
         # Swap color to play 
         self.color_to_play = (1 - self.color_to_play)
         # Special moves stuff
-        self.two_push_col[color] = move.two_push_col_was
-        if move.prevents_castle_queenside:
-            assert not self.can_castle_queenside[color]
-            self.can_castle_queenside[color] = True
-        if move.prevents_castle_kingside:
-            assert not self.can_castle_kingside[color]
-            self.can_castle_kingside[color] = True
-        if move.piece == KING:
-            self.king_row[color] = move.row1
-            self.king_col[color] = move.col1          
+        (self.hash, self.two_push_col[1 - color],
+            self.can_castle_kingside[color], self.can_castle_queenside[color],
+            self.can_castle_kingside[1 - color], self.can_castle_queenside[1 - color],
+            self.material, self.positional) = self.history.pop()
+        self.two_push_col[color] = -1
+        if move >> MOVE_PIECE_SHIFT & 7 == KING:
+            self.king_square[color] = sq1
+
+    def play_null(self):
+        """
+        Pass the turn (see null move pruning in negamax): only the color
+        to play and the en passant column change
+        """
+        enemy = 1 - self.color_to_play
+        self.history.append((self.hash, self.two_push_col[enemy]))
+        h = self.hash ^ ZOBRIST_WHITE_TO_PLAY
+        if self.two_push_col[enemy] >= 0:
+            h ^= ZOBRIST_EN_PASSANT[self.two_push_col[enemy]]
+            self.two_push_col[enemy] = -1
+        self.hash = h
+        self.color_to_play = enemy
+
+    def unplay_null(self):
+        """Unplay a null move (the last one played)"""
+        self.color_to_play = 1 - self.color_to_play
+        self.hash, self.two_push_col[1 - self.color_to_play] = self.history.pop()
 
     def resolve_move(self, move):
-        # If row1 and col1 are filled move is considered resolved
-        if move.row1 is not None and move.col1 is not None: return True
+        # If the start tile is filled move is considered resolved
+        if move.sq1 is not None: return True
         # Move need to be resolved
         matching_moves = []
-        moves = self.get_pseudo_legal_moves(self.color_to_play)
+        moves = [Move.decode(m) for m in self.get_pseudo_legal_moves(self.color_to_play)]
         for m in moves:
-            if m.piece == move.piece and m.row2 == move.row2 and m.col2 == move.col2 and m.promote == move.promote:
+            if m.piece == move.piece and m.sq2 == move.sq2 and m.promote == move.promote:
                 matching_moves.append(m)
         length = len(matching_moves)
         if length == 0:
@@ -221,460 +476,736 @@ class Position:
             return False        
     
     def check_move(self, move):
-        moves = self.get_legal_moves(self.color_to_play)
-        try:
-            index = moves.index(move)
-            move = moves[index]
-            return True
-        except ValueError:
-            return False
+        # Is a resolved Move legal
+        moves = [Move.decode(m) for m in self.get_legal_moves(self.color_to_play)]
+        for m in moves:
+            if m == move:
+                # Fill the special moves stuff
+                move.fill(m)
+                return True
+        return False
 
     def get_legal_moves(self, color):
-        # Get possible moves from each tile without considering check situation
-        moves = self.get_pseudo_legal_moves(color)
-        # Redo a list with only the moves that do not lead to check situation
+        """
+        Get the legal moves from the checks and pins of the king:
+        pinned pieces stay on their pin ray and, in check, moves must capture
+        the checker or block its ray (only king moves in double check)
+        Only king moves and en passant captures are played to be checked
+        """
+        tiles = self.tiles
+        enemy = 1 - color
+        king = self.king_square[color]
+        checks = 0
+        # Tiles a move must end on to escape a single check
+        evasions = None
+        # Ray (up to the pinning piece) of each pinned piece
+        pins = {}
+        for rays, sliders in ((ROOK_RAYS[king], (ROOK, QUEEN)), (BISHOP_RAYS[king], (BISHOP, QUEEN))):
+            for ray in rays:
+                pinned = None
+                for i, to in enumerate(ray):
+                    target = tiles[to]
+                    if target is None:
+                        continue
+                    if target.color == color and pinned is None:
+                        pinned = to
+                        continue
+                    if target.color == enemy and target.piece in sliders:
+                        if pinned is None:
+                            checks += 1
+                            evasions = set(ray[:i + 1])
+                        else:
+                            pins[pinned] = set(ray[:i + 1])
+                    break
+        for to in KNIGHT_TARGETS[king]:
+            target = tiles[to]
+            if target is not None and target.color == enemy and target.piece == KNIGHT:
+                checks += 1
+                evasions = {to}
+        sens = +10 if color == WHITE else -10
+        for to in (king + sens - 1, king + sens + 1):
+            target = tiles[to]
+            if target is not None and target.color == enemy and target.piece == PAWN:
+                checks += 1
+                evasions = {to}
+        # Only the king can escape a double check
+        if checks > 1:
+            moves = self.get_moves_for_king(king, color)
+        else:
+            moves = self.get_pseudo_legal_moves(color)
         legal_moves = []
         for m in moves:
-            self.play(m)
-            if not self.is_check(color): legal_moves.append(m)
-            self.unplay(m)
+            sq1 = m & 127
+            if sq1 == king or m & MOVE_EN_PASSANT:
+                # The king must not go to an attacked tile, en passant
+                # removes two pieces from the capture row
+                self.play(m)
+                if not self.is_check(color): legal_moves.append(m)
+                self.unplay(m)
+                continue
+            sq2 = m >> MOVE_SQ2_SHIFT & 127
+            if evasions is not None and sq2 not in evasions:
+                continue
+            if sq1 in pins and sq2 not in pins[sq1]:
+                continue
+            legal_moves.append(m)
         return legal_moves
     
+    def has_legal_move(self, color):
+        # Stop at the first move that does not lead to check situation
+        for m in self.get_pseudo_legal_moves(color):
+            self.play(m)
+            legal = not self.is_check(color)
+            self.unplay(m)
+            if legal:
+                return True
+        return False
+
+    def get_mobility(self, color):
+        """
+        Count the pseudo-legal moves without generating them
+        (castling is not counted and a promotion counts once)
+        """
+        tiles = self.tiles
+        enemy = 1 - color
+        count = 0
+        for sq in self.piece_squares[color]:
+            piece = tiles[sq].piece
+            if piece == PAWN:
+                sens = +10 if color == WHITE else -10
+                if tiles[sq + sens] is None:
+                    count += 1
+                    # Two tiles from the initial row
+                    if ROWS[sq] == (1 if color == WHITE else 6) and tiles[sq + 2*sens] is None:
+                        count += 1
+                for d in (sens - 1, sens + 1):
+                    target = tiles[sq + d]
+                    if target is not None and target.color == enemy:
+                        count += 1
+            elif piece == KNIGHT or piece == KING:
+                for to in KNIGHT_TARGETS[sq] if piece == KNIGHT else KING_TARGETS[sq]:
+                    target = tiles[to]
+                    if target is None or target.color == enemy:
+                        count += 1
+            else:
+                if piece == ROOK:
+                    rays = ROOK_RAYS[sq]
+                elif piece == BISHOP:
+                    rays = BISHOP_RAYS[sq]
+                else:
+                    rays = QUEEN_RAYS[sq]
+                for ray in rays:
+                    for to in ray:
+                        target = tiles[to]
+                        if target is None:
+                            count += 1
+                            continue
+                        if target.color == enemy:
+                            count += 1
+                        break
+        return count
+
     def get_pseudo_legal_moves(self, color):
-        # Get possible moves from each tile without considering check situation
+        # Get possible moves of each piece without considering check situation
         moves = []
-        for row in range(8):
-            for col in range(8):
-                moves += self.get_moves_for_tile(row, col, color)
+        for sq in self.piece_squares[color]:
+            moves += self.get_moves_for_tile(sq, color)
         return moves
 
-    def get_moves_for_tile(self, row, col, color):
-        # Assertions
-        assert row in range(8)
-        assert col in range(8)
+    def get_moves_for_tile(self, sq, color):
+        # Get the piece
+        piece = self.tiles[sq]
         # No moves for empty tile
-        if self.tiles[row][col] is None:
+        if piece is None:
             return []
-        # Get the piece
-        piece = self.tiles[row][col]
         # Check the color
         if piece.color != color:
             return []
         # It now depends of the piece type
         if piece.piece == PAWN:
-            return self.get_moves_for_pawn(row, col, color)
+            return self.get_moves_for_pawn(sq, color)
         elif piece.piece == ROOK:
-            return self.get_moves_for_rook(row, col, color)
+            return self.get_moves_for_rook(sq, color)
         elif piece.piece == BISHOP:
-            return self.get_moves_for_bishop(row, col, color)
+            return self.get_moves_for_bishop(sq, color)
         elif piece.piece == KNIGHT:
-            return self.get_moves_for_knight(row, col, color)
+            return self.get_moves_for_knight(sq, color)
         elif piece.piece == KING:
-            return self.get_moves_for_king(row, col, color)
+            return self.get_moves_for_king(sq, color)
         elif piece.piece == QUEEN:
-            return self.get_moves_for_queen(row, col, color)
+            return self.get_moves_for_queen(sq, color)
 
-    def get_moves_for_king(self, row, col, color):
+    def get_moves_for_king(self, sq, color):
+        tiles = self.tiles
         moves = []
-        for d in KING_MOVES:
-            if self.is_empty_tile(row + d[0], col + d[1]):
-                moves.append(Move(KING, row + d[0], col + d[1], row, col))
-            elif self.is_capturable_tile(row + d[0], col + d[1], color):
-                moves.append(Move(KING, row + d[0], col + d[1], row, col, self._capture))
-        # Castling
+        move = sq | KING << MOVE_PIECE_SHIFT
+        for to in KING_TARGETS[sq]:
+            target = tiles[to]
+            if target is None:
+                moves.append(move | to << MOVE_SQ2_SHIFT)
+            elif target.color == 1 - color and target.piece != KING:
+                moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+        # Castling (not out of check)
+        if (self.can_castle_kingside[color] or self.can_castle_queenside[color]) and self.is_tile_attacked(sq, color):
+            return moves
         if self.can_castle_kingside[color]:
             # King-side castling
-            if self.tiles[row][5] is None and self.tiles[row][6] is None:
-                if self.tiles[row][7] is not None and self.tiles[row][7].piece == ROOK and self.tiles[row][7].color == color:
-                    if (not self.is_tile_attacked(row, 5, color) and not self.is_tile_attacked(row, 6, color)):
-                        moves.append(Move(KING, row, 6, row, 4, castling = KING))
+            if tiles[sq + 1] is None and tiles[sq + 2] is None:
+                rook = tiles[sq + 3]
+                if rook is not None and rook.piece == ROOK and rook.color == color:
+                    if (not self.is_tile_attacked(sq + 1, color) and not self.is_tile_attacked(sq + 2, color)):
+                        moves.append(move | (sq + 2) << MOVE_SQ2_SHIFT | MOVE_CASTLE_KINGSIDE)
         if self.can_castle_queenside[color]:
             # Queen-side castling
-            if self.tiles[row][3] is None and self.tiles[row][2] is None and self.tiles[row][1] is None:
-                if self.tiles[row][0] is not None and self.tiles[row][0].piece == ROOK and self.tiles[row][0].color == color:
-                    if (not self.is_tile_attacked(row, 3, color) and not self.is_tile_attacked(row, 2, color)):
-                        moves.append(Move(KING, row, 2, row, 4, castling = QUEEN))
+            if tiles[sq - 1] is None and tiles[sq - 2] is None and tiles[sq - 3] is None:
+                rook = tiles[sq - 4]
+                if rook is not None and rook.piece == ROOK and rook.color == color:
+                    if (not self.is_tile_attacked(sq - 1, color) and not self.is_tile_attacked(sq - 2, color)):
+                        moves.append(move | (sq - 2) << MOVE_SQ2_SHIFT | MOVE_CASTLE_QUEENSIDE)
         return moves
 
-    def get_moves_for_queen(self, row, col, color):
-        return self.get_moves_for_rook(row, col, color, QUEEN) + self.get_moves_for_bishop(row, col, color, QUEEN)
+    def get_moves_for_queen(self, sq, color):
+        return self.get_moves_for_slider(sq, color, QUEEN, QUEEN_RAYS[sq])
 
-    def get_moves_for_rook(self, row, col, color, piece = ROOK):
-        moves = []
-        # To the left
-        for c in range(col - 1, -1, -1):
-            if self.tiles[row][c] is None:
-                moves.append(Move(piece, row, c, row, col))
-            elif self.is_capturable_tile_o(row, c, color):
-                moves.append(Move(piece, row, c, row, col, self._capture))
-                break
-            else:
-                break
-        # To the right
-        for c in range(col + 1, 8, +1):
-            if self.tiles[row][c] is None:
-                moves.append(Move(piece, row, c, row, col))
-            elif self.is_capturable_tile_o(row, c, color):
-                moves.append(Move(piece, row, c, row, col, self._capture))
-                break
-            else:
-                break
-        # To the top
-        for r in range(row + 1, 8, +1):
-            if self.tiles[r][col] is None:
-                moves.append(Move(piece, r, col, row, col))
-            elif self.is_capturable_tile_o(r, col, color):
-                moves.append(Move(piece, r, col, row, col, self._capture))
-                break
-            else:
-                break
-        # To the bottom
-        for r in range(row - 1, -1, -1):
-            if self.tiles[r][col] is None:
-                moves.append(Move(piece, r, col, row, col))
-            elif self.is_capturable_tile_o(r, col, color):
-                moves.append(Move(piece, r, col, row, col, self._capture))
-                break
-            else:
-                break
-        return moves
+    def get_moves_for_rook(self, sq, color):
+        return self.get_moves_for_slider(sq, color, ROOK, ROOK_RAYS[sq])
+
+    def get_moves_for_bishop(self, sq, color):
+        return self.get_moves_for_slider(sq, color, BISHOP, BISHOP_RAYS[sq])
 
-    def get_moves_for_bishop(self, row, col, color, piece = BISHOP):
+    def get_moves_for_slider(self, sq, color, piece, rays):
+        tiles = self.tiles
         moves = []
-        # To Top-Right
-        r, c = row + 1, col + 1
-        while r < 8 and c < 8:
-            if self.tiles[r][c] is None:
-                moves.append(Move(piece, r, c, row, col))
-            elif self.is_capturable_tile_o(r, c, color):
-                moves.append(Move(piece, r, c, row, col, self._capture))
+        move = sq | piece << MOVE_PIECE_SHIFT
+        for ray in rays:
+            # Slide until a piece or the end of the ray is met
+            for to in ray:
+                target = tiles[to]
+                if target is None:
+                    moves.append(move | to << MOVE_SQ2_SHIFT)
+                    continue
+                if target.color == 1 - color and target.piece != KING:
+                    moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
                 break
-            else:
-                break
-            r, c = r + 1, c + 1
-        # To Top-Left
-        r, c = row + 1, col - 1
-        while r < 8 and c >= 0:
-            if self.tiles[r][c] is None:
-                moves.append(Move(piece, r, c, row, col))
-            elif self.is_capturable_tile_o(r, c, color):
-                moves.append(Move(piece, r, c, row, col, self._capture))
-                break
-            else:
-                break
-            r, c = r + 1, c - 1
-        # To Bottom-Left
-        r, c = row - 1, col - 1
-        while r >= 0 and c >= 0:
-            if self.tiles[r][c] is None:
-                moves.append(Move(piece, r, c, row, col))
-            elif self.is_capturable_tile_o(r, c, color):
-                moves.append(Move(piece, r, c, row, col, self._capture))
-                break
-            else:
-                break
-            r, c = r - 1, c - 1
-        # To Bottom-Right
-        r, c = row - 1, col + 1
-        while r >= 0 and c < 8:
-            if self.tiles[r][c] is None:
-                moves.append(Move(piece, r, c, row, col))
-            elif self.is_capturable_tile_o(r, c, color):
-                moves.append(Move(piece, r, c, row, col, self._capture))
-                break
-            else:
-                break
-            r, c = r - 1, c + 1
         return moves
 
-    def get_moves_for_knight(self, row, col, color):
+    def get_moves_for_knight(self, sq, color):
+        tiles = self.tiles
         moves = []
-        for d in KNIGHT_MOVES:
-            if self.is_empty_tile(row + d[0], col + d[1]):
-                moves.append(Move(KNIGHT, row + d[0], col + d[1], row, col))
-            elif self.is_capturable_tile(row + d[0], col + d[1], color):
-                moves.append(Move(KNIGHT, row + d[0], col + d[1], row, col, self._capture))
+        move = sq | KNIGHT << MOVE_PIECE_SHIFT
+        for to in KNIGHT_TARGETS[sq]:
+            target = tiles[to]
+            if target is None:
+                moves.append(move | to << MOVE_SQ2_SHIFT)
+            elif target.color == 1 - color and target.piece != KING:
+                moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
         return moves
 
-    def get_moves_for_pawn(self, row, col, color):
+    def get_moves_for_pawn(self, sq, color):
+        row = ROWS[sq]
         if color == WHITE:
-            sens = +1
+            sens = +10
             init_row = (row == 1)
             prom_row = (row == 6)
             ep_row = (row == 4)
         else:
-            sens = -1
+            sens = -10
             init_row = (row == 6)
             prom_row = (row == 1)
             ep_row = (row == 3)
+        tiles = self.tiles
         moves = []
+        move = sq | PAWN << MOVE_PIECE_SHIFT
         # Move one tile
-        if self.is_empty_tile(row + sens, col):
-            moves.append(Move(PAWN, row + sens, col, row, col))
+        if tiles[sq + sens] is None:
+            moves.append(move | (sq + sens) << MOVE_SQ2_SHIFT)
             # Move two tiles
-            if init_row and self.tiles[row + 2*sens][col] is None:
-                moves.append(Move(PAWN, row + 2*sens, col, row, col))
-        # Capture on left
-        if col > 0:
-            if self.is_capturable_tile(row + sens, col - 1, color):
-                moves.append(Move(PAWN, row + sens, col - 1, row, col, self._capture))
-            elif ep_row and self.two_push_col[1 - color] == col - 1:
-                # Capture en passant
-                moves.append(Move(PAWN, row + sens, col - 1, row, col, PAWN, en_passant = True))
-        # Capture on right
-        if col < 7:
-            if self.is_capturable_tile(row + sens, col + 1, color):
-                moves.append(Move(PAWN, row + sens, col + 1, row, col, self._capture))
-            elif ep_row and self.two_push_col[1 - color] == col + 1:
-                # Capture en passant
-                moves.append(Move(PAWN, row + sens, col + 1, row, col, PAWN, en_passant = True))
+            if init_row and tiles[sq + 2*sens] is None:
+                moves.append(move | (sq + 2*sens) << MOVE_SQ2_SHIFT)
+        # Capture on left and right
+        for to in (sq + sens - 1, sq + sens + 1):
+            target = tiles[to]
+            if target is None:
+                if ep_row and self.two_push_col[1 - color] == COLS[to]:
+                    # Capture en passant
+                    moves.append(move | to << MOVE_SQ2_SHIFT | PAWN << MOVE_CAPTURE_SHIFT | MOVE_EN_PASSANT)
+            elif target.color == 1 - color and target.piece != KING:
+                moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
         # Promotion
         if prom_row and moves: 
-            promotions = (QUEEN, KNIGHT, ROOK, BISHOP)
-            p_moves = []
-            for m in moves:
-                for p in promotions:
-                    p_m = m.copy()
-                    p_m.promote = p
-                    p_moves.append(p_m)
-            return p_moves
+            return [m | p << MOVE_PROMOTE_SHIFT for m in moves for p in PROMOTIONS]
         return moves
 
-    def is_empty_tile(self, row, col):
-        if row < 0: return False
-        if col < 0: return False
-        if row > 7: return False
-        if col > 7: return False
-        return self.tiles[row][col] is None
-
-    def is_capturable_tile(self, row, col, color):
-        if row < 0: return False
-        if col < 0: return False
-        if row > 7: return False
-        if col > 7: return False
-        piece = self.tiles[row][col]
-        if piece is None: return False
-        if piece.color == color: return False
-        if piece.piece == KING: return False
-        # Store the captured piece to store in move
-        self._capture = piece.piece
-        return True
-
-    # Optimized version
-    def is_capturable_tile_o(self, row, col, color):
-        piece = self.tiles[row][col]
-        if piece is None: return False
-        if piece.color == color: return False
-        if piece.piece == KING: return False
-        # Store the captured piece to store in move
-        self._capture = piece.piece
-        return True
+    def get_capture_moves(self, color):
+        """
+        Get the pseudo-legal captures and promotions only, for quiescence search
+        Quiet moves are not built at all
+        """
+        tiles = self.tiles
+        enemy = 1 - color
+        moves = []
+        for sq in self.piece_squares[color]:
+            piece = tiles[sq].piece
+            move = sq | piece << MOVE_PIECE_SHIFT
+            if piece == PAWN:
+                p_moves = []
+                row = ROWS[sq]
+                sens = +10 if color == WHITE else -10
+                # Move one tile to the last row
+                if row == (6 if color == WHITE else 1) and tiles[sq + sens] is None:
+                    p_moves.append(move | (sq + sens) << MOVE_SQ2_SHIFT)
+                # Capture on left and right
+                for to in (sq + sens - 1, sq + sens + 1):
+                    target = tiles[to]
+                    if target is None:
+                        if row == (4 if color == WHITE else 3) and self.two_push_col[enemy] == COLS[to]:
+                            # Capture en passant
+                            p_moves.append(move | to << MOVE_SQ2_SHIFT | PAWN << MOVE_CAPTURE_SHIFT | MOVE_EN_PASSANT)
+                    elif target.color == enemy and target.piece != KING:
+                        p_moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+                # Promotion
+                if row == (6 if color == WHITE else 1):
+                    moves += [m | p << MOVE_PROMOTE_SHIFT for m in p_moves for p in PROMOTIONS]
+                else:
+                    moves += p_moves
+            elif piece == KNIGHT or piece == KING:
+                for to in KNIGHT_TARGETS[sq] if piece == KNIGHT else KING_TARGETS[sq]:
+                    target = tiles[to]
+                    if target is not None and target.color == enemy and target.piece != KING:
+                        moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+            else:
+                if piece == ROOK:
+                    rays = ROOK_RAYS[sq]
+                elif piece == BISHOP:
+                    rays = BISHOP_RAYS[sq]
+                else:
+                    rays = QUEEN_RAYS[sq]
+                for ray in rays:
+                    for to in ray:
+                        target = tiles[to]
+                        if target is not None:
+                            if target.color == enemy and target.piece != KING:
+                                moves.append(move | to << MOVE_SQ2_SHIFT | target.piece << MOVE_CAPTURE_SHIFT)
+                            break
+        return moves
 
-    # Optimized version for is_tile_attacked
-    def is_attackable_tile(self, row, col, color):
-        if self.tiles[row][col].color == color: return False
-        self._capture = self.tiles[row][col].piece
-        return True
-        
-    def is_tile_attacked(self, row, col, color):
+    def is_tile_attacked(self, sq, color):
+        tiles = self.tiles
+        enemy = 1 - color
         # Check bishop style attacks (including bishop, pawn, king and queen)
-        # - On top-right
-        r, c = row + 1, col + 1
-        while r < 8 and c < 8:
-            if self.tiles[r][c] is None:
-                pass
-            elif self.is_attackable_tile(r, c, color):
-                if self._capture == BISHOP:
-                    return True
-                elif self._capture == PAWN:
-                    if r == row + 1 and color == WHITE: return True
-                elif self._capture == KING:
-                    if r == row + 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-            r, c = r + 1, c + 1     
-        # - On top-left
-        r, c = row + 1, col - 1
-        while r < 8 and c >= 0:
-            if self.tiles[r][c] is None:
-                pass
-            elif self.is_attackable_tile(r, c, color):
-                if self._capture == BISHOP:
-                    return True
-                elif self._capture == PAWN:
-                    if r == row + 1 and color == WHITE: return True
-                elif self._capture == KING:
-                    if r == row + 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-            r, c = r + 1, c - 1     
-        # - On bottom-left
-        r, c = row - 1, col - 1
-        while r >= 0 and c >= 0:
-            if self.tiles[r][c] is None:
-                pass
-            elif self.is_attackable_tile(r, c, color):
-                if self._capture == BISHOP:
-                    return True
-                elif self._capture == PAWN:
-                    if r == row - 1 and color == BLACK: return True
-                elif self._capture == KING:
-                    if r == row - 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-            r, c = r - 1, c - 1     
-        # - On bottom-right
-        r, c = row - 1, col + 1
-        while r >= 0 and c < 8:
-            if self.tiles[r][c] is None:
-                pass
-            elif self.is_attackable_tile(r, c, color):
-                if self._capture == BISHOP:
-                    return True
-                elif self._capture == PAWN:
-                    if r == row - 1 and color == BLACK: return True
-                elif self._capture == KING:
-                    if r == row - 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-            r, c = r - 1, c + 1     
+        for ray in BISHOP_RAYS[sq]:
+            to = ray[0]
+            piece = tiles[to]
+            if piece is not None:
+                # Adjacent tile
+                if piece.color == enemy:
+                    if piece.piece in (BISHOP, QUEEN, KING):
+                        return True
+                    if piece.piece == PAWN and (to > sq) == (color == WHITE):
+                        return True
+                continue
+            # Slide until a piece or the end of the ray is met
+            for to in ray:
+                piece = tiles[to]
+                if piece is not None:
+                    if piece.color == enemy and piece.piece in (BISHOP, QUEEN):
+                        return True
+                    break
         # Check rook style attacks (including rook, king and queen)
-        # - On left
-        for c in range(col - 1, -1, -1):
-            if self.tiles[row][c] is None:
-                pass
-            elif self.is_attackable_tile(row, c, color):
-                if self._capture == ROOK:
-                    return True
-                elif self._capture == KING:
-                    if c == col - 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-        # - On right
-        for c in range(col + 1, 8):
-            if self.tiles[row][c] is None:
-                pass
-            elif self.is_attackable_tile(row, c, color):
-                if self._capture == ROOK:
+        for ray in ROOK_RAYS[sq]:
+            piece = tiles[ray[0]]
+            if piece is not None:
+                # Adjacent tile
+                if piece.color == enemy and piece.piece in (ROOK, QUEEN, KING):
                     return True
-                elif self._capture == KING:
-                    if c == col + 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-        # - On top
-        for r in range(row + 1, 8):
-            if self.tiles[r][col] is None:
-                pass
-            elif self.is_attackable_tile(r, col, color):
-                if self._capture == ROOK:
-                    return True
-                elif self._capture == KING:
-                    if r == row + 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
-        # - On bottom
-        for r in range(row - 1, -1, -1):
-            if self.tiles[r][col] is None:
-                pass
-            elif self.is_attackable_tile(r, col, color):
-                if self._capture == ROOK:
-                    return True
-                elif self._capture == KING:
-                    if r == row - 1: return True
-                elif self._capture == QUEEN:
-                    return True
-                break
-            else:
-                break
+                continue
+            # Slide until a piece or the end of the ray is met
+            for to in ray:
+                piece = tiles[to]
+                if piece is not None:
+                    if piece.color == enemy and piece.piece in (ROOK, QUEEN):
+                        return True
+                    break
         # Check knight attack
-        for d in KNIGHT_MOVES:
-            if self.is_capturable_tile(row + d[0], col + d[1], color):
-                if self._capture == KNIGHT:
-                    return True
+        for to in KNIGHT_TARGETS[sq]:
+            piece = tiles[to]
+            if piece is not None and piece.color == enemy and piece.piece == KNIGHT:
+                return True
         # Not attacked then
         return False
     
     def is_check(self, color):
-        assert self.tiles[self.king_row[color]][self.king_col[color]].piece == KING
-        assert self.tiles[self.king_row[color]][self.king_col[color]].color == color
-        return self.is_tile_attacked(self.king_row[color], self.king_col[color], color)
+        assert self.tiles[self.king_square[color]].piece == KING
+        assert self.tiles[self.king_square[color]].color == color
+        return self.is_tile_attacked(self.king_square[color], color)
 
     def get_material_value(self):
-        material = [0, 0]
-        for row in range(8):
-            for col in range(8):
-                if self.tiles[row][col] is not None:
-                    material[self.tiles[row][col].color] += self.tiles[row][col].get_material_value()
-        return material[self.color_to_play] - material[1 - self.color_to_play]
+        # Material score from the color to play point of view
+        return self.material if self.color_to_play == WHITE else -self.material
+
+    def get_positional_value(self):
+        # Positional score (centipawns) from the color to play point of view
+        return self.positional if self.color_to_play == WHITE else -self.positional
+
+    def eval_static(self, coef_t = 2, coef_m = 3, coef_p = 3):
+        """
+        eval without the mate and stalemate detection, for the quiescence
+        stand pat (see eval for the coefs)
+        """
+        # Mobility is counted on pseudo-legal moves, that is cheaper
+        mobility = self.get_mobility(self.color_to_play) - self.get_mobility(1 - self.color_to_play)
+        # Evaluate position according to coefs
+        return (mobility * coef_t) + (self.get_material_value() * coef_m) + (self.get_positional_value() * coef_p) // 10
 
-    def eval(self, coef_t = 2, coef_m = 3):
+    def eval(self, coef_t = 2, coef_m = 3, coef_p = 3):
         """
         coef_t = Coef for tactical score (mobility)
         coef_m = Coef for material score (material value)
+        coef_p = Coef for positional score (piece-square tables)
+        Piece-square tables are in centipawns while a pawn is worth 10 in
+        material value, hence the division of the positional score by 10
         """
-        mobility = len(self.get_legal_moves(self.color_to_play))
         # Mate situations
-        if mobility == 0:
+        if not self.has_legal_move(self.color_to_play):
             if self.is_check(self.color_to_play):
                 return -MATE
             else:
                 return DRAW
-        # Get adversary mobility by temporarily swapping color
-        mobility -= len(self.get_legal_moves(1 - self.color_to_play))
-        # Evaluate position according to coefs
-        return (mobility * coef_t) + (self.get_material_value() * coef_m)
+        return self.eval_static(coef_t, coef_m, coef_p)
         
-    def get_best_move(self):
-        return self.get_best_move_negamax(3)
+    def get_best_move(self, max_time = 5, max_nodes = None):
+        # Book moves are played without search
+        if self.book is not None:
+            move = self.book.get_move(self)
+            if move is not None:
+                print("Book: {}".format(Move.decode(move)))
+                return move
+        return self.get_best_move_iterative(max_time, max_nodes)
         
-    def get_best_move_negamax(self, depth):
+    def get_best_move_negamax(self, depth, processes = 1):
+        """
+        processes > 1 searches on that many processes sharing
+        the transposition table (see smp)
+        """
+        if processes > 1:
+            return smp.search(self, processes, max_depth = depth)
+        self.start_search()
         score, move = self.negamax(depth, -INFINITY, +INFINITY)
-        print("Negamax({}): {} [{}]".format(depth, score, ", ".join([str(m) for m in move])))
+        if self.stopped:
+            self.stats.nodes = self.nodes
+            return None
+        self.stats.add_depth(depth, self.nodes)
+        self.report_depth(depth, score, move)
         if move: return move[0]
 
-    def negamax(self, depth, alpha, beta):
+    def get_best_move_iterative(self, max_time = None, max_nodes = None, max_depth = 64, processes = 1):
         """
-        See Negamax with alpha beta pruning
+        Iterative deepening: search depth 1, 2, 3... until the time (seconds)
+        or nodes budget runs out and return the best move of the last
+        depth that finished
+        The principal variation of each depth is searched first at the next one
+        processes > 1 searches on that many processes (see smp)
+        """
+        if processes > 1:
+            return smp.search(self, processes, max_time, max_nodes, max_depth)
+        started = time.perf_counter()
+        self.start_search()
+        best_move = None
+        for depth in range(1, max_depth + 1):
+            # Aspiration windows: search around the previous depth score
+            # first, with a wider window each time the score falls outside
+            delta = self.aspiration_window
+            if delta and self.score is not None and abs(self.score) < KNOWN_WIN:
+                alpha, beta = self.score - delta, self.score + delta
+            else:
+                alpha, beta = -INFINITY, +INFINITY
+            while True:
+                score, move = self.negamax(depth, alpha, beta)
+                if self.stopped:
+                    break
+                if score <= alpha:
+                    alpha = max(score - delta, -INFINITY)
+                elif score >= beta:
+                    beta = min(score + delta, +INFINITY)
+                else:
+                    break
+                delta *= 2
+            if self.stopped:
+                break
+            move = self.extend_pv(move, depth)
+            self.pv = move
+            self.score = score
+            self.stats.add_depth(depth, self.nodes)
+            self.report_depth(depth, score, move)
+            if not move:
+                break
+            best_move = move[0]
+            # Nothing more to find once a mate is seen
+            if abs(score) >= MATE_BOUND:
+                break
+            # Depth 1 always finishes, budgets apply to deeper searches
+            if max_time is not None:
+                self.deadline = started + max_time
+                # The next depth would not finish in the remaining time anyway
+                if time.perf_counter() - started > max_time / 2:
+                    break
+            self.max_nodes = max_nodes
+        # The nodes of a depth that did not finish count too
+        self.stats.nodes = self.nodes
+        self.deadline = None
+        self.max_nodes = None
+        return best_move
+
+    def report_depth(self, depth, score, pv):
+        # Called each time a depth is searched (see on_depth to replace it)
+        if self.on_depth is not None:
+            self.on_depth(depth, score, pv, self.stats)
+            return
+        print("Negamax({}): {} [{}] {} nodes {} nps".format(depth, score, ", ".join([str(Move.decode(m)) for m in pv]),
+            self.nodes, self.stats.get_nps()))
+
+    def extend_pv(self, pv, depth):
+        """
+        Return the principal variation completed up to depth moves with the
+        transposition table moves: a cutoff on a table entry (often stored
+        by another process, see smp) only gives the first move of its line
+        """
+        pv = list(pv)
+        played = []
+        for move in pv:
+            self.play(move)
+            played.append(move)
+        seen = {self.hash}
+        while len(pv) < depth:
+            entry = self.tt.probe(self.hash)
+            if entry is None or not entry[4] or entry[4] not in self.get_legal_moves(self.color_to_play):
+                break
+            self.play(entry[4])
+            played.append(entry[4])
+            pv.append(entry[4])
+            # A repetition would go on forever
+            if self.hash in seen:
+                break
+            seen.add(self.hash)
+        for move in reversed(played):
+            self.unplay(move)
+        return tuple(pv)
+
+    def start_search(self):
+        # Reset search state
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.max_nodes = None
+        self.pv = ()
+        self.score = None
+        self.ordering.clear()
+        self.stats.clear()
+
+    def is_search_limit_reached(self):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return True
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        return False
+
+    def negamax(self, depth, alpha, beta, ply = 0, null_move = True):
+        """
+        See Negamax with alpha beta pruning and transposition tables
         on https://en.wikipedia.org/wiki/Negamax
+        null_move is False right after a null move, not to pass twice
         """
+        if ply == 0:
+            self.follow_pv = True
+            self.root_piece_count = self.get_piece_count()
+        # Check search budget from time to time
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.is_search_limit_reached():
+            self.stopped = True
+        if self.stopped:
+            return 0, ()
+        stats = self.stats
+        alpha_was = alpha
+        # Transposition table lookup
+        tt_move = None
+        stats.tt_probes += 1
+        entry = self.tt.probe(self.hash)
+        if entry is not None:
+            stats.tt_hits += 1
+            tt_move = entry[4]
+            # No cutoff at the root, it needs the whole principal variation
+            if entry[1] >= depth and ply > 0:
+                score = _score_from_tt(entry[3], ply)
+                if entry[2] == EXACT:
+                    stats.tt_cutoffs += 1
+                    return score, (tt_move,) if tt_move else ()
+                elif entry[2] == LOWER:
+                    alpha = max(alpha, score)
+                elif entry[2] == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    stats.tt_cutoffs += 1
+                    return score, (tt_move,) if tt_move else ()
+        # Endgame bitbases (not at the root that needs a move)
+        if ply > 0 and self.bitbases is not None and self.get_piece_count() == 3:
+            stats.bitbase_probes += 1
+            result = self.bitbases.probe(self)
+            if result is not None:
+                stats.bitbase_hits += 1
+            if result == 0:
+                return DRAW, ()
+            # Once the root is in the ending, the search has to find the mate
+            # itself, the evaluation of a known win makes the winning side progress
+            if result is not None and self.root_piece_count > 3 and not (result < 0 and self.is_check(self.color_to_play)):
+                stats.evals += 1
+                return result * KNOWN_WIN + self.eval(), ()
         if depth == 0:
-            return self.eval(), ()
-        moves = self.get_legal_moves(self.color_to_play)
+            # Resolve the captures before evaluating
+            score = self.quiesce(alpha, beta, ply)
+            if self.stopped:
+                return 0, ()
+            if score <= alpha:
+                flag = UPPER
+            elif score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(self.hash, 0, flag, _score_to_tt(score, ply), None)
+            return score, ()
+        color = self.color_to_play
+        in_check = self.is_check(color)
+        # Null move pruning: if the opponent can not reach beta even when we
+        # pass, a real move would fail high too. Not in check, nor on the
+        # principal variation, nor without pieces where passing may be the
+        # best move (zugzwang)
+        reduction = self.null_move_reduction
+        if (reduction and null_move and ply > 0 and depth > reduction and not self.follow_pv
+                and not in_check and abs(beta) < KNOWN_WIN and self.has_piece(color)):
+            stats.null_moves += 1
+            self.play_null()
+            score = -self.negamax(depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)[0]
+            self.unplay_null()
+            if self.stopped:
+                return 0, ()
+            if score >= beta:
+                stats.null_move_cutoffs += 1
+                return beta, ()
+        moves = self.get_legal_moves(color)
         if len(moves) == 0:
-            return self.eval(), ()
+            # Mated (the sooner the worse) or stalemate
+            score = -MATE + ply if in_check else DRAW
+            self.tt.store(self.hash, depth, EXACT, _score_to_tt(score, ply), None)
+            return score, ()
+        # Search the previous iteration principal variation move first
+        # then the transposition table move, then the others by ordering score
+        pv_move = None
+        if self.follow_pv:
+            if ply < len(self.pv) and self.pv[ply] in moves:
+                pv_move = self.pv[ply]
+            else:
+                self.follow_pv = False
+        self.ordering.sort(moves, ply)
+        for first in (tt_move, pv_move):
+            if first is not None and first in moves:
+                i = moves.index(first)
+                moves.insert(0, moves.pop(i))
         best_score, best_move = -INFINITY, ()
-        for m in moves:
+        reduction = self.late_move_reduction
+        for i, m in enumerate(moves):
             self.play(m)
-            score, move_tuple = self.negamax(depth - 1, -beta, -alpha)
-            score *= -1
+            # Principal variation search: the first move gets the full window,
+            # the others a zero window that only tells whether they beat alpha,
+            # they are searched again with the full window if they do
+            if i == 0:
+                score, move_tuple = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                score *= -1
+            else:
+                # Late move reductions: quiet moves ordered late (not killers
+                # nor checks) are searched less deep first, at full depth
+                # again if they beat alpha
+                if (reduction and i >= self.late_move_count and depth > reduction + 1 and not in_check
+                        and self.ordering.score(m, ply) < KILLER_SCORE and not self.is_check(1 - color)):
+                    stats.reductions += 1
+                    score, move_tuple = self.negamax(depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                    score *= -1
+                    if score > alpha:
+                        stats.re_searches += 1
+                else:
+                    score = alpha + 1
+                if score > alpha and not self.stopped:
+                    score, move_tuple = self.negamax(depth - 1, -alpha - 1, -alpha, ply + 1)
+                    score *= -1
+                if alpha < score < beta and not self.stopped:
+                    score, move_tuple = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                    score *= -1
             self.unplay(m)
+            # Only the first move may follow the principal variation
+            self.follow_pv = False
+            if self.stopped:
+                return 0, ()
             if score > best_score:
                 best_score = score
                 best_move = (m,) + move_tuple
             alpha = max(alpha, score)
             if alpha >= beta:
+                stats.cutoffs += 1
+                if i == 0:
+                    stats.first_move_cutoffs += 1
+                self.ordering.cutoff(m, depth, ply)
                 break
+        # Transposition table store
+        if best_score <= alpha_was:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(self.hash, depth, flag, _score_to_tt(best_score, ply), best_move[0])
         return best_score, best_move
 
-
+    def quiesce(self, alpha, beta, ply):
+        """
+        Quiescence search: keep searching captures and promotions until the
+        position is quiet so the evaluation is not made in the middle of an
+        exchange, the side to play may stand pat on the static evaluation
+        (eval without the mate test). In check there is no standing pat: all
+        evasions are searched, which finds the mates
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.is_search_limit_reached():
+            self.stopped = True
+        if self.stopped:
+            return 0
+        stats = self.stats
+        stats.qnodes += 1
+        color = self.color_to_play
+        if self.is_check(color):
+            moves = self.get_legal_moves(color)
+            if not moves:
+                return -MATE + ply
+            best_score = -INFINITY
+        else:
+            stats.evals += 1
+            best_score = self.eval_static()
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha, best_score)
+            moves = self.get_capture_moves(color)
+        self.ordering.sort(moves, ply)
+        for m in moves:
+            self.play(m)
+            if self.is_check(color):
+                self.unplay(m)
+                continue
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            self.unplay(m)
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+        return best_score
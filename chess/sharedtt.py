@@ -0,0 +1,69 @@
+from .const import *
+
+from multiprocessing import shared_memory
+
+# Words of 64 bits per entry: check, score, data
+ENTRY_WORDS = 3
+# Scores are stored with this offset to be unsigned
+SCORE_OFFSET = 1 << 32
+MASK64 = (1 << 64) - 1
+
+# Shared transposition table class
+class SharedTranspositionTable:
+    """
+    Transposition table held in a shared memory buffer so several search
+    processes can use it, with the same interface as TranspositionTable
+    It is lock-free: an entry is stored as (key ^ score ^ data, score, data)
+    where data packs move, depth and flag, so an entry torn by concurrent
+    writes does not match its key anymore and is just a miss
+    """
+
+    def __init__(self, size = 1 << 20, name = None):
+        # Size must be a power of two so the index is a simple mask
+        assert size > 0 and size & (size - 1) == 0
+        self.mask = size - 1
+        # Create the buffer, or attach to an existing one by name
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create = True, size = size * ENTRY_WORDS * 8)
+        else:
+            self.shm = shared_memory.SharedMemory(name = name)
+        # A new shared memory buffer is zero filled, that is empty entries
+        self.words = self.shm.buf.cast("Q")
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def clear(self):
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+
+    def probe(self, key):
+        index = (key & self.mask) * ENTRY_WORDS
+        words = self.words
+        check, score, data = words[index], words[index + 1], words[index + 2]
+        if check ^ score ^ data != key or data == 0:
+            return None
+        return (key, data >> 32 & 0xff, data >> 40 & 3, score - SCORE_OFFSET, (data & 0xffffffff) or None)
+
+    def store(self, key, depth, flag, score, move):
+        index = (key & self.mask) * ENTRY_WORDS
+        words = self.words
+        old = words[index + 2]
+        # Depth-preferred replacement, but always replace another position
+        if old and words[index] ^ words[index + 1] ^ old == key and depth < old >> 32 & 0xff:
+            return
+        # Bit 42 marks the entry as used (data is never 0)
+        data = (move or 0) | depth << 32 | flag << 40 | 1 << 42
+        score += SCORE_OFFSET
+        words[index] = (key ^ score ^ data) & MASK64
+        words[index + 1] = score
+        words[index + 2] = data
+
+    def close(self):
+        # Release the memory views before closing the buffer
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        # Free the buffer (only the creator should do it)
+        self.shm.unlink()
@@ -0,0 +1,80 @@
+from .const import *
+from .sharedtt import SharedTranspositionTable
+
+import multiprocessing
+import random
+
+# Parallel search (Lazy SMP)
+#
+# Every process searches the same position with iterative deepening and
+# they all share one transposition table, so the helpers fill it with
+# results the main search finds there instead of searching again.
+# Helpers only help if they do not all follow the main search path: each
+# one starts at another depth, searches full windows where the main search
+# uses aspiration windows and orders its quiet moves with its own noise.
+# The main search honours the time and nodes budgets, its result is the
+# one returned and the helpers stop when it is done.
+
+# Counters each helper sends back to the main search
+HELPER_COUNTERS = 2
+
+# Seconds a helper has to stop once the main search is done
+HELPER_STOP_TIMEOUT = 0.05
+
+def _helper(position, tt_name, tt_size, number, max_depth, stop_event, counters):
+    # Search run by the helper processes until the main search is done
+    position.tt = SharedTranspositionTable(tt_size, tt_name)
+    position.start_search()
+    position.stop_event = stop_event
+    # Ties between quiet moves broken differently in each helper
+    rng = random.Random(number)
+    position.ordering.history = [rng.randrange(16) for h in position.ordering.history]
+    try:
+        for depth in range(1 + number % 2, max_depth + 2):
+            score, move = position.negamax(depth, -INFINITY, +INFINITY)
+            if position.stopped:
+                break
+            position.pv = move
+            counters[number * HELPER_COUNTERS] = position.nodes
+            counters[number * HELPER_COUNTERS + 1] = position.stats.qnodes
+    finally:
+        counters[number * HELPER_COUNTERS] = position.nodes
+        counters[number * HELPER_COUNTERS + 1] = position.stats.qnodes
+        position.tt.close()
+
+def search(position, processes, max_time = None, max_nodes = None, max_depth = 64, tt_size = 1 << 20):
+    """
+    Iterative deepening search of the position on that many processes
+    max_nodes is the budget of all the processes together
+    Return the best move as get_best_move_iterative does, the nodes of the
+    helpers are added to the position nodes and statistics
+    """
+    tt = SharedTranspositionTable(tt_size)
+    stop_event = multiprocessing.Event()
+    counters = multiprocessing.Array("q", HELPER_COUNTERS * processes, lock = False)
+    helpers = [multiprocessing.Process(target = _helper,
+        args = (position, tt.name, tt_size, i, max_depth, stop_event, counters), daemon = True)
+        for i in range(1, processes)]
+    local_tt = position.tt
+    position.tt = tt
+    try:
+        for helper in helpers:
+            helper.start()
+        if max_nodes is not None:
+            max_nodes = max(max_nodes // processes, 1)
+        return position.get_best_move_iterative(max_time, max_nodes, max_depth)
+    finally:
+        stop_event.set()
+        # Helpers check the stop event every 1024 nodes, the ones that are
+        # late keep the counts of the depths they finished
+        for helper in helpers:
+            helper.join(HELPER_STOP_TIMEOUT)
+            if helper.is_alive():
+                helper.terminate()
+                helper.join()
+        position.tt = local_tt
+        tt.close()
+        tt.unlink()
+        position.nodes += sum(counters[0::HELPER_COUNTERS])
+        position.stats.nodes = position.nodes
+        position.stats.qnodes += sum(counters[1::HELPER_COUNTERS])
@@ -0,0 +1,93 @@
+import time
+
+# Search statistics class
+class SearchStats:
+    """
+    Counters of a search (see negamax) and the nodes and time of each
+    depth of iterative deepening. Counting is a few integer increments per
+    node so it is always on, read it from the on_depth hook (its stats
+    argument) or once the search returns, nodes then include the depth that
+    did not finish and the helper processes (see smp)
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.started = time.perf_counter()
+        # Nodes (negamax and quiescence) and quiescence nodes only
+        self.nodes = 0
+        self.qnodes = 0
+        # Static evaluations of leaves
+        self.evals = 0
+        # Transposition table probes, entries found and cutoffs they gave
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        # Endgame bitbases probes and positions found
+        self.bitbase_probes = 0
+        self.bitbase_hits = 0
+        # Beta cutoffs and those made by the first move searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Null move searches and the cutoffs they gave
+        self.null_moves = 0
+        self.null_move_cutoffs = 0
+        # Late moves reduced and searched again at full depth
+        self.reductions = 0
+        self.re_searches = 0
+        # (depth, nodes of that depth, seconds of that depth) of each depth searched
+        self.depths = []
+
+    def add_depth(self, depth, nodes):
+        """Record a finished depth, nodes is the search nodes count so far"""
+        elapsed = time.perf_counter() - self.started
+        self.nodes = nodes
+        self.depths.append((depth, nodes - sum(d[1] for d in self.depths), elapsed - sum(d[2] for d in self.depths)))
+
+    def get_elapsed(self):
+        return time.perf_counter() - self.started
+
+    def get_nps(self):
+        return int(self.nodes / max(self.get_elapsed(), 1e-3))
+
+    def get_branching_factor(self):
+        # Nodes of the last depth per node of the one before
+        if len(self.depths) < 2 or self.depths[-2][1] == 0:
+            return None
+        return self.depths[-1][1] / self.depths[-2][1]
+
+    def get_first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else None
+
+    def get_tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else None
+
+    def get_bitbase_hit_rate(self):
+        return self.bitbase_hits / self.bitbase_probes if self.bitbase_probes else None
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "evals": self.evals,
+            "time": round(self.get_elapsed(), 3),
+            "nps": self.get_nps(),
+            "depths": [{"depth": d, "nodes": n, "time": round(t, 3)} for d, n, t in self.depths],
+            "branching_factor": self.get_branching_factor(),
+            "first_move_cutoff_rate": self.get_first_move_cutoff_rate(),
+            "tt_hit_rate": self.get_tt_hit_rate(),
+            "tt_cutoffs": self.tt_cutoffs,
+            "bitbase_hit_rate": self.get_bitbase_hit_rate(),
+            "null_moves": self.null_moves,
+            "null_move_cutoffs": self.null_move_cutoffs,
+            "reductions": self.reductions,
+            "re_searches": self.re_searches,
+        }
+
+    def __str__(self):
+        return "{} nodes in {:.2f} s ({} nps), tt hits {}, first move cutoffs {}".format(self.nodes,
+            self.get_elapsed(), self.get_nps(), _percent(self.get_tt_hit_rate()), _percent(self.get_first_move_cutoff_rate()))
+
+def _percent(rate):
+    return "-" if rate is None else "{:.0%}".format(rate)
@@ -0,0 +1,25 @@
+from .const import *
+
+# Time manager class
+class TimeManager:
+    """
+    Split the remaining game clock across the moves still to play
+    Times are in seconds
+    """
+
+    def __init__(self, moves_to_go = 30, min_time = 0.05, safety = 0.1):
+        # Number of moves the remaining time must last when the clock gives no hint
+        self.moves_to_go = moves_to_go
+        # Never think less than this
+        self.min_time = min_time
+        # Always keep this on the clock to absorb move overhead
+        self.safety = safety
+
+    def allocate(self, remaining, increment = 0, moves_to_go = None):
+        """Return the thinking time for the next move"""
+        if moves_to_go is None:
+            moves_to_go = self.moves_to_go
+        budget = remaining / max(1, moves_to_go) + increment * 0.75
+        # Never spend more than what is left on the clock
+        budget = min(budget, remaining - self.safety)
+        return max(self.min_time, budget)
@@ -0,0 +1,30 @@
+from .const import *
+
+# Transposition table class
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results indexed by Zobrist key
+    An entry is a tuple (key, depth, flag, score, move)
+    """
+
+    def __init__(self, size = 1 << 20):
+        # Size must be a power of two so the index is a simple mask
+        assert size > 0 and size & (size - 1) == 0
+        self.mask = size - 1
+        self.entries = [None] * size
+
+    def clear(self):
+        self.entries = [None] * (self.mask + 1)
+
+    def probe(self, key):
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self.mask
+        entry = self.entries[index]
+        # Depth-preferred replacement, but always replace another position
+        if entry is None or entry[0] != key or depth >= entry[1]:
+            self.entries[index] = (key, depth, flag, score, move)
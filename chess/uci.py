@@ -0,0 +1,234 @@
+from .const import *
+from .position import Position
+from .timeman import TimeManager
+
+import queue
+import sys
+import threading
+import time
+
+# Universal Chess Interface
+# See http://wbec-ridderkerk.nl/html/UCIProtocol.html
+#
+# Commands are read from stdin on their own thread and handled on the main
+# thread while the search runs on another one, so isready, stop and
+# ponderhit are answered at once. stop sets the position stopped flag that
+# negamax checks at every node, the search unwinds within milliseconds and
+# the best move of the last finished depth is sent.
+
+NAME = "DumbChess"
+AUTHOR = "Guillaume Mayer"
+
+# Material values are 10 per pawn and the evaluation weights them by 3
+CENTIPAWNS_PER_POINT = 100 / 30
+
+def move_to_uci(move):
+    """Return a move (int) in UCI notation: e2e4, e7e8q"""
+    sq1, sq2 = move & 127, move >> MOVE_SQ2_SHIFT & 127
+    s = "abcdefgh"[COLS[sq1]] + str(ROWS[sq1] + 1) + "abcdefgh"[COLS[sq2]] + str(ROWS[sq2] + 1)
+    promote = move >> MOVE_PROMOTE_SHIFT & 7
+    if promote:
+        s += PIECE_SHORT[promote].lower()
+    return s
+
+def uci_to_move(position, s):
+    """Return the legal move (int) of a move in UCI notation, None if there is none"""
+    for m in position.get_legal_moves(position.color_to_play):
+        if move_to_uci(m) == s:
+            return m
+    return None
+
+# UCI engine class
+class UCIEngine:
+
+    def __init__(self, backend = Position, input = sys.stdin, output = sys.stdout):
+        self.position = backend()
+        self.position.start()
+        # Search progress goes to the GUI as info lines
+        self.position.on_depth = self.report_depth
+        self.input = input
+        self.output = output
+        self.time_manager = TimeManager()
+        self.lock = threading.Lock()
+        self.commands = queue.Queue()
+        # Search thread and its state
+        self.thread = None
+        self.stop_event = None
+        self.pondering = False
+        self.infinite = False
+        # Set when bestmove may be sent (after stop or ponderhit in ponder
+        # and infinite modes)
+        self.release = threading.Event()
+        self.ponder_time = None
+        self.timer = None
+        self.started = None
+        self.max_nodes = None
+
+    def send(self, s):
+        with self.lock:
+            self.output.write(s + "\n")
+            self.output.flush()
+
+    def read(self):
+        # Read commands on the reader thread, the end of input means quit
+        for line in self.input:
+            self.commands.put(line)
+        self.commands.put("quit")
+
+    def run(self):
+        threading.Thread(target = self.read, daemon = True).start()
+        while self.handle(self.commands.get()):
+            pass
+
+    def handle(self, line):
+        """Handle a command line, return False on quit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name " + NAME)
+            self.send("id author " + AUTHOR)
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.wait_search()
+            self.position.tt.clear()
+        elif command == "position":
+            self.wait_search()
+            self.set_position(args)
+        elif command == "go":
+            self.wait_search()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponderhit()
+        elif command == "quit":
+            self.stop()
+            self.wait_search()
+            return False
+        return True
+
+    def set_position(self, args):
+        if args and args[0] == "startpos":
+            self.position.start()
+            args = args[1:]
+        elif args and args[0] == "fen":
+            fen = []
+            args = args[1:]
+            while args and args[0] != "moves":
+                fen.append(args.pop(0))
+            self.position.set_fen(" ".join(fen))
+        if args and args[0] == "moves":
+            for s in args[1:]:
+                move = uci_to_move(self.position, s)
+                if move is None:
+                    self.send("info string illegal move " + s)
+                    break
+                self.position.play(move)
+
+    def go(self, args):
+        limits = {}
+        i = 0
+        while i < len(args):
+            if args[i] in ("ponder", "infinite"):
+                limits[args[i]] = True
+                i += 1
+            elif args[i] == "searchmoves":
+                # Not supported, skip the moves
+                i += 1
+                while i < len(args) and not args[i].isalpha():
+                    i += 1
+            else:
+                if i + 1 < len(args):
+                    limits[args[i]] = int(args[i + 1])
+                i += 2
+        color = self.position.color_to_play
+        clock, increment = ("wtime", "winc") if color == WHITE else ("btime", "binc")
+        max_time = None
+        if "movetime" in limits:
+            max_time = limits["movetime"] / 1000
+        elif clock in limits:
+            max_time = self.time_manager.allocate(limits[clock] / 1000, limits.get(increment, 0) / 1000, limits.get("movestogo"))
+        max_depth = limits.get("depth", 64)
+        self.max_nodes = limits.get("nodes")
+        self.infinite = limits.get("infinite", False)
+        self.pondering = limits.get("ponder", False)
+        self.release.clear()
+        if self.pondering:
+            # The clock runs from ponderhit only
+            self.ponder_time, max_time = max_time, None
+        if not (self.pondering or self.infinite):
+            self.release.set()
+        self.stop_event = threading.Event()
+        self.position.stop_event = self.stop_event
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target = self.search, args = (max_time, max_depth))
+        self.thread.start()
+
+    def search(self, max_time, max_depth):
+        # Run on the search thread
+        position = self.position
+        move = position.get_best_move_iterative(max_time, self.max_nodes, max_depth)
+        # Totals with the nodes of the last depth, finished or not
+        elapsed = time.perf_counter() - self.started
+        self.send("info nodes {} time {} nps {}".format(position.stats.nodes, int(elapsed * 1000),
+            int(position.stats.nodes / max(elapsed, 1e-3))))
+        if move is None:
+            # Stopped before the first depth finished
+            moves = position.get_legal_moves(position.color_to_play)
+            move = moves[0] if moves else None
+        # Ponder and infinite searches wait for ponderhit or stop
+        self.release.wait()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if move is None:
+            self.send("bestmove 0000")
+            return
+        s = "bestmove " + move_to_uci(move)
+        pv = position.pv
+        if len(pv) > 1 and pv[0] == move:
+            s += " ponder " + move_to_uci(pv[1])
+        self.send(s)
+
+    def report_depth(self, depth, score, pv, stats):
+        elapsed = time.perf_counter() - self.started
+        if abs(score) >= MATE_BOUND:
+            # Mate in moves from the plies to the mate
+            moves = (MATE - abs(score) + 1) // 2
+            score = "mate {}".format(moves if score > 0 else -moves)
+        else:
+            score = "cp {}".format(round(score * CENTIPAWNS_PER_POINT))
+        self.send("info depth {} score {} nodes {} time {} nps {} pv {}".format(depth, score,
+            stats.nodes, int(elapsed * 1000), int(stats.nodes / max(elapsed, 1e-3)),
+            " ".join(move_to_uci(m) for m in pv)))
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        # Stop now, without waiting for the next search limits check
+        self.position.stopped = True
+        self.release.set()
+
+    def ponderhit(self):
+        if self.thread is None or not self.pondering:
+            return
+        self.pondering = False
+        # Now searching on our own clock
+        if self.ponder_time is not None and not self.infinite:
+            self.timer = threading.Timer(self.ponder_time, self.stop)
+            self.timer.start()
+        if not self.infinite:
+            self.release.set()
+
+    def wait_search(self):
+        # Stop the search (if any) and wait for its bestmove
+        if self.thread is not None:
+            self.stop()
+            self.thread.join()
+            self.thread = None
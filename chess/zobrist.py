@@ -0,0 +1,28 @@
+from .const import *
+
+import random
+
+# Zobrist keys
+# Fixed seed so that hash values are the same from one run to another
+_random = random.Random(0x0d0b5ee5)
+
+def _key():
+    return _random.getrandbits(64)
+
+# One key per color, piece and board index: ZOBRIST_PIECE[color][piece][sq]
+# Off-board indexes never hold a piece, their key is 0
+ZOBRIST_PIECE = tuple(
+    tuple(
+        tuple(_key() if ROWS[sq] >= 0 else 0 for sq in range(BOARD_SIZE))
+        for piece in range(6))
+    for color in range(2))
+
+# One key per color and castling side
+ZOBRIST_CASTLE_KINGSIDE     = (_key(), _key())
+ZOBRIST_CASTLE_QUEENSIDE    = (_key(), _key())
+
+# One key per en passant column
+ZOBRIST_EN_PASSANT = tuple(_key() for col in range(8))
+
+# Key toggled when white is to play
+ZOBRIST_WHITE_TO_PLAY = _key()
@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import functools
+import io
+import math
+import multiprocessing
+import sys
+import time
+
+import chess
+from chess.const import *
+from chess.uci import uci_to_move, move_to_uci
+from chess.epd import read_positions
+
+# Default openings (UCI moves from the start position, see get_opening_fen)
+OPENINGS = (
+	"e2e4 e7e5 g1f3 b8c6 f1b5",
+	"e2e4 e7e5 g1f3 b8c6 f1c4",
+	"e2e4 c7c5 g1f3 d7d6",
+	"e2e4 c7c5 b1c3 b8c6",
+	"e2e4 e7e6 d2d4 d7d5",
+	"e2e4 c7c6 d2d4 d7d5",
+	"d2d4 d7d5 c2c4 e7e6",
+	"d2d4 d7d5 c2c4 c7c6",
+	"d2d4 g8f6 c2c4 g7g6",
+	"d2d4 g8f6 c2c4 e7e6 g1f3",
+	"c2c4 e7e5 b1c3",
+	"g1f3 d7d5 g2g3",
+)
+
+# Engine options: search limits, evaluation coefficients and position
+# attributes, with the converter of their value
+ENGINE_OPTIONS = {"depth": int, "time": float, "nodes": int, "backend": str}
+EVAL_OPTIONS = {"coef_t": int, "coef_m": int, "coef_p": int}
+POSITION_OPTIONS = {
+	"null_move_reduction": int,
+	"late_move_reduction": int,
+	"late_move_count": int,
+	"aspiration_window": int,
+}
+
+def parse_engine(s):
+	"""
+	Return the engine configuration of 'depth=3 coef_t=1 null_move_reduction=0'
+	depth, time (seconds per move), nodes and backend limit the search,
+	coef_* are the evaluation coefficients, the others are the position
+	search settings of POSITION_OPTIONS
+	"""
+	engine = {"depth": 3, "time": None, "nodes": None, "backend": "mailbox", "eval": {}, "settings": {}}
+	for option in s.split():
+		name, _, value = option.partition("=")
+		if name in ENGINE_OPTIONS:
+			engine[name] = ENGINE_OPTIONS[name](value)
+		elif name in EVAL_OPTIONS:
+			engine["eval"][name] = EVAL_OPTIONS[name](value)
+		elif name in POSITION_OPTIONS:
+			engine["settings"][name] = POSITION_OPTIONS[name](value)
+		else:
+			raise ValueError("unknown engine option: {}".format(name))
+	if engine["backend"] not in chess.BACKENDS:
+		raise ValueError("unknown backend: {}".format(engine["backend"]))
+	return engine
+
+def make_position(engine):
+	backend = chess.BACKENDS[engine["backend"]]
+	if engine["eval"]:
+		# Same backend with other default coefficients, for eval and for the
+		# quiescence stand pat
+		backend = type(backend.__name__, (backend,), {"__slots__": (),
+			"eval": functools.partialmethod(backend.eval, **engine["eval"]),
+			"eval_static": functools.partialmethod(backend.eval_static, **engine["eval"])})
+	position = backend()
+	for name, value in engine["settings"].items():
+		setattr(position, name, value)
+	return position
+
+def get_opening_fen(moves):
+	"""Return the FEN of the position after the UCI moves from the start position"""
+	position = chess.Position()
+	position.start()
+	for s in moves.split():
+		position.play(uci_to_move(position, s))
+	return position.get_fen()
+
+def is_insufficient_material(position):
+	# Kings alone or with a single bishop or knight
+	pieces = [piece.piece for piece in position.get_pieces() if piece is not None and piece.piece != KING]
+	return len(pieces) == 0 or len(pieces) == 1 and pieces[0] in (BISHOP, KNIGHT)
+
+def play_game(task):
+	"""
+	Play a game between two engines (run by the process pool)
+	Return the game result from the first engine point of view
+	"""
+	number, fen, engines, first_color, max_plies, resign_score, resign_plies = task
+	# One position per engine (by color), each one keeps its transposition table
+	positions = [None, None]
+	positions[first_color] = make_position(engines[0])
+	positions[1 - first_color] = make_position(engines[1])
+	for position in positions:
+		position.set_fen(fen)
+	moves = []
+	repetitions = {positions[0].hash: 1}
+	# Plies since the last capture or pawn move
+	halfmoves = 0
+	# Side both engines have seen winning by resign_score and for how many plies
+	leader, leading = None, 0
+	# Winner color (None for a draw) and why the game ended
+	winner, reason = None, None
+	while reason is None:
+		color = positions[0].color_to_play
+		position = positions[color]
+		engine = engines[0 if color == first_color else 1]
+		if not position.has_legal_move(color):
+			if position.is_check(color):
+				winner, reason = 1 - color, "mate"
+			else:
+				reason = "stalemate"
+			break
+		# The search prints its progress
+		with contextlib.redirect_stdout(io.StringIO()):
+			move = position.get_best_move_iterative(engine["time"], engine["nodes"], engine["depth"])
+		moves.append(move_to_uci(move))
+		for p in positions:
+			p.play(move)
+		# Draws
+		if move >> MOVE_CAPTURE_SHIFT & 7 or move >> MOVE_PIECE_SHIFT & 7 == PAWN:
+			halfmoves = 0
+		else:
+			halfmoves += 1
+		key = positions[0].hash
+		repetitions[key] = repetitions.get(key, 0) + 1
+		if repetitions[key] >= 3:
+			reason = "repetition"
+		elif halfmoves >= 100:
+			reason = "fifty moves"
+		elif is_insufficient_material(positions[0]):
+			reason = "insufficient material"
+		elif len(moves) >= max_plies:
+			reason = "draw adjudication"
+		elif resign_score:
+			# The game is over when the scores of both sides agree long enough
+			score = position.score
+			side = color if score >= resign_score else 1 - color if score <= -resign_score else None
+			leading = leading + 1 if side is not None and side == leader else 1
+			leader = side
+			if leader is not None and leading >= resign_plies:
+				winner, reason = leader, "win adjudication"
+	if winner is None:
+		points = 0.5
+	else:
+		points = 1.0 if winner == first_color else 0.0
+	return {"game": number, "fen": fen, "first_color": COLOR_NAMES[first_color],
+		"points": points, "reason": reason, "moves": " ".join(moves)}
+
+def get_stats(wins, draws, losses):
+	"""
+	Return (Elo difference, 95% margin) of the results
+	The margin comes from the variance of the game results (trinomial)
+	"""
+	games = wins + draws + losses
+	score = (wins + draws / 2) / games
+	if score <= 0 or score >= 1:
+		return (math.inf if score >= 1 else -math.inf), math.inf
+	variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+	margin = 1.96 * math.sqrt(variance / games)
+	to_elo = lambda s: -400 * math.log10(1 / min(max(s, 1e-6), 1 - 1e-6) - 1)
+	return to_elo(score), (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+def get_llr(wins, draws, losses, elo0, elo1):
+	"""
+	Log-likelihood ratio of elo1 against elo0 (normal approximation of the
+	trinomial game results, see sequential probability ratio test)
+	"""
+	games = wins + draws + losses
+	score = (wins + draws / 2) / games
+	variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+	if variance == 0:
+		return 0.0
+	s0 = 1 / (1 + 10 ** (-elo0 / 400))
+	s1 = 1 / (1 + 10 ** (-elo1 / 400))
+	return games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+def run(engines, openings, games, processes = None, max_plies = 300, resign_score = 300, resign_plies = 6,
+		elo0 = 0, elo1 = 5, alpha = 0.05, beta = 0.05, output = sys.stdout):
+	"""
+	Play up to games games between two engines from the openings (FEN), each
+	one twice with colors reversed, and stop early once the SPRT accepts
+	elo0 or elo1
+	Return (wins, draws, losses) of the first engine
+	"""
+	lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+	tasks = ((i, openings[i // 2 % len(openings)], engines, WHITE if i % 2 == 0 else BLACK,
+		max_plies, resign_score, resign_plies) for i in range(games))
+	wins = draws = losses = 0
+	started = time.perf_counter()
+	with multiprocessing.Pool(processes) as pool:
+		for game in pool.imap_unordered(play_game, tasks):
+			if game["points"] == 1:
+				wins += 1
+			elif game["points"] == 0:
+				losses += 1
+			else:
+				draws += 1
+			count = wins + draws + losses
+			difference, margin = get_stats(wins, draws, losses)
+			llr = get_llr(wins, draws, losses, elo0, elo1)
+			output.write("Game {} (engine1 {}): {} by {}, {}-{}-{}, Elo {:.1f} +/- {:.1f}, LLR {:.2f} [{:.2f}, {:.2f}], {:.2f} games/s\n".format(
+				game["game"] + 1, game["first_color"], game["points"], game["reason"],
+				wins, losses, draws, difference, margin, llr, lower, upper, count / (time.perf_counter() - started)))
+			output.flush()
+			if llr <= lower or llr >= upper:
+				output.write("SPRT: {} accepted\n".format("H1 (elo1)" if llr >= upper else "H0 (elo0)"))
+				# Leaving the pool terminates the games still running
+				break
+	return wins, draws, losses
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Play games between two engine configurations and measure the Elo difference")
+	parser.add_argument("engine1", type = parse_engine, help = "tested engine options, e.g. 'depth=3 late_move_reduction=0'")
+	parser.add_argument("engine2", type = parse_engine, help = "reference engine options")
+	parser.add_argument("--games", type = int, default = 1000, help = "maximum number of games")
+	parser.add_argument("--openings", help = "FEN or EPD file of the opening positions (default: a few common openings)")
+	parser.add_argument("--processes", type = int, help = "games played at a time (default: one per core)")
+	parser.add_argument("--max-plies", type = int, default = 300, help = "adjudicate a draw after that many plies")
+	parser.add_argument("--resign-score", type = int, default = 300, help = "adjudicate a win when the mover score stays above (0: never)")
+	parser.add_argument("--resign-plies", type = int, default = 6, help = "number of moves the score must stay above")
+	parser.add_argument("--elo0", type = float, default = 0, help = "SPRT null hypothesis Elo difference")
+	parser.add_argument("--elo1", type = float, default = 5, help = "SPRT alternative hypothesis Elo difference")
+	args = parser.parse_args()
+	openings = [get_opening_fen(moves) for moves in OPENINGS]
+	if args.openings:
+		with open(args.openings) as f:
+			openings = [fen for number, fen, operations in read_positions(f)]
+	started = time.perf_counter()
+	wins, draws, losses = run([args.engine1, args.engine2], openings, args.games, args.processes, args.max_plies,
+		args.resign_score, args.resign_plies, args.elo0, args.elo1)
+	count = wins + draws + losses
+	print("{} games in {:.1f} s ({:.2f} games/s)".format(count, time.perf_counter() - started, count / (time.perf_counter() - started)))
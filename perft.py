@@ -0,0 +1,110 @@
+import argparse
+import multiprocessing
+import time
+
+import chess
+from chess.const import START_FEN
+from chess.move import Move
+
+# Known perft counts (depth 1, 2, 3...) to validate the move generator
+# See https://www.chessprogramming.org/Perft_Results
+SUITE = (
+	(START_FEN, (20, 400, 8902, 197281, 4865609)),
+	("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", (48, 2039, 97862, 4085603)),
+	("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", (14, 191, 2812, 43238, 674624)),
+	("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", (6, 264, 9467, 422333)),
+	("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", (44, 1486, 62379, 2103487)),
+)
+
+def perft(position, depth, cache = None):
+	"""
+	Count the leaf nodes of the legal moves tree
+	cache is an optional dictionary of sub-tree counts by (hash, depth)
+	"""
+	moves = position.get_legal_moves(position.color_to_play)
+	# Bulk counting: no need to play the last ply
+	if depth <= 1:
+		return len(moves) if depth == 1 else 1
+	if cache is not None:
+		key = (position.hash, depth)
+		if key in cache:
+			return cache[key]
+	nodes = 0
+	for m in moves:
+		position.play(m)
+		nodes += perft(position, depth - 1, cache)
+		position.unplay(m)
+	if cache is not None:
+		cache[key] = nodes
+	return nodes
+
+def new_position(backend, fen):
+	position = chess.BACKENDS[backend]()
+	position.set_fen(fen)
+	return position
+
+def divide_move(args):
+	# Count one root move sub-tree (run by the process pool)
+	backend, fen, move, depth, use_cache = args
+	position = new_position(backend, fen)
+	position.play(move)
+	return str(Move.decode(move)), perft(position, depth - 1, {} if use_cache else None)
+
+def divide(backend, fen, depth, processes = 1, use_cache = True):
+	"""
+	Return the list of (move, nodes) for each root move
+	Root moves are split across a process pool if processes > 1
+	"""
+	position = new_position(backend, fen)
+	if depth < 1:
+		return []
+	moves = position.get_legal_moves(position.color_to_play)
+	tasks = [(backend, fen, m, depth, use_cache) for m in moves]
+	if processes > 1:
+		with multiprocessing.Pool(processes) as pool:
+			return pool.map(divide_move, tasks)
+	# Share the cache between root moves when running in one process
+	cache = {} if use_cache else None
+	results = []
+	for m in moves:
+		position.play(m)
+		results.append((str(Move.decode(m)), perft(position, depth - 1, cache)))
+		position.unplay(m)
+	return results
+
+def run(backend, fen, depth, processes, use_cache, show_divide):
+	started = time.perf_counter()
+	results = divide(backend, fen, depth, processes, use_cache)
+	elapsed = time.perf_counter() - started
+	nodes = sum(n for m, n in results) if depth > 0 else 1
+	if show_divide:
+		for m, n in results:
+			print("{}: {}".format(m, n))
+	print("Depth {}: {} nodes in {:.2f} s ({:.0f} nps)".format(depth, nodes, elapsed, nodes / max(elapsed, 1e-9)))
+	return nodes
+
+def run_suite(backend, max_depth, processes, use_cache):
+	failures = 0
+	for fen, counts in SUITE:
+		print(fen)
+		for depth, expected in enumerate(counts[:max_depth], 1):
+			nodes = run(backend, fen, depth, processes, use_cache, False)
+			if nodes != expected:
+				print("FAILED: expected {}".format(expected))
+				failures += 1
+	print("{} failure(s)".format(failures))
+	return failures
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Count move generator leaf nodes")
+	parser.add_argument("depth", type = int, nargs = "?", default = 4)
+	parser.add_argument("--fen", default = START_FEN, help = "start position (default: regular start position)")
+	parser.add_argument("--divide", action = "store_true", help = "show the nodes count of each root move")
+	parser.add_argument("--processes", type = int, default = 1, help = "split root moves across that many processes")
+	parser.add_argument("--no-cache", action = "store_true", help = "do not cache sub-tree counts by position hash")
+	parser.add_argument("--backend", choices = sorted(chess.BACKENDS), default = "mailbox")
+	parser.add_argument("--suite", action = "store_true", help = "check known perft counts up to depth")
+	args = parser.parse_args()
+	if args.suite:
+		exit(1 if run_suite(args.backend, args.depth, args.processes, not args.no_cache) else 0)
+	run(args.backend, args.fen, args.depth, args.processes, not args.no_cache, args.divide)
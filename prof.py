@@ -11,10 +11,10 @@ g = chess.Game()
 p = g.position
 
 # Initialise e2-e4 move 
-m = chess.move.Move(chess.const.PAWN, 3, 4, 1, 4)
+m = chess.move.Move(chess.const.PAWN, chess.const.SQUARES[3][4], chess.const.SQUARES[1][4])
 
 # PLay and print
-p.play(m)
+p.play(m.encode())
 print(p)
 
 # Generate profile file
@@ -22,10 +22,7 @@ depth     = 4
 now       = datetime.datetime.now()
 file_name = "negamax{}_{:0>4}{:0>2}{:0>2}_{:0>2}{:0>2}{:0>2}.prof".format(depth, now.year, now.month, now.day, now.hour, now.minute, now.second)
 
-for d in range(1, depth):
-	p.get_best_move_negamax(d)
-
-cProfile.run("p.get_best_move_negamax({})".format(depth), file_name)
+cProfile.run("p.get_best_move_iterative(max_depth = {})".format(depth), file_name)
 
 # Open snakeviz
 os.system("snakeviz " + file_name)
\ No newline at end of file
@@ -0,0 +1,10 @@
+import argparse
+
+import chess
+from chess.uci import UCIEngine
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Run the engine with the Universal Chess Interface protocol")
+	parser.add_argument("--backend", choices = sorted(chess.BACKENDS), default = "mailbox")
+	args = parser.parse_args()
+	UCIEngine(chess.BACKENDS[args.backend]).run()